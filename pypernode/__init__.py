@@ -1,13 +1,33 @@
+from .engine import GraphExecutor
+from .graph import Graph
 from .library import NodeLibrary
 from .models import NodeData
-from .execution import ExecutionWorker, WorkerSignals
-from .window import MainWindow
 
 NodeLibrary.register_default_nodes()
 
+# Qt-based classes are imported on first access, so scripted use of the
+# engine never pays for loading PyQt5.
+_LAZY_ATTRS = {
+    'ExecutionWorker': '.execution',
+    'WorkerSignals': '.execution',
+    'MainWindow': '.window',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        import importlib
+
+        module = importlib.import_module(_LAZY_ATTRS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     'NodeLibrary',
     'NodeData',
+    'Graph',
+    'GraphExecutor',
     'ExecutionWorker',
     'WorkerSignals',
     'MainWindow',
@@ -0,0 +1,314 @@
+"""Command line entry point: ``python -m pypernode <command>``."""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+from .distributed import DEFAULT_PORT, DistributedExecutor, parse_address, serve_worker
+from .engine import GraphExecutor, output_nodes
+from .graph import Graph
+from .graph_io import iter_graph
+from .cache import ResultCache, budget_from_env
+from .history import RunHistory, RunStats, graph_hash
+from .journal import JournalLocked, RunJournal, journal_dir
+from .paths import history_path, timings_path
+from .sandbox import SandboxPool, preload_from_env
+from .timings import TimingStore
+from .values import preview_text
+from .watch import GraphWatcher
+
+
+def _cmd_worker(args) -> int:
+    serve_worker(args.host, args.port)
+    return 0
+
+
+def _cmd_serve(args) -> int:
+    from .server import serve
+
+    graphs = {}
+    for spec in args.graph or []:
+        name, sep, path = spec.partition("=")
+        if not sep:
+            name, path = os.path.splitext(os.path.basename(spec))[0], spec
+        graphs[name] = path
+    serve(args.host, args.port, graphs)
+    return 0
+
+
+def _cmd_run(args) -> int:
+    graph = Graph()
+    unknown = graph.populate(iter_graph(args.graph))
+    if unknown:
+        print(f"Unknown node types: {', '.join(sorted(unknown))}", file=sys.stderr)
+
+    connections = graph.connections
+    targets = [_find_node(graph, ref).id for ref in args.target] if args.target else None
+    if targets is None and args.outputs_only:
+        targets = output_nodes(graph.nodes) or None
+    timings = TimingStore(timings_path())
+    try:
+        journal = RunJournal(journal_dir(graph.nodes)) if args.checkpoint else None
+    except JournalLocked as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if journal is not None and len(journal):
+        print(f"Resuming with {len(journal)} checkpointed results", file=sys.stderr)
+    sandbox = None
+    if args.sandbox is not None:
+        sandbox = SandboxPool(
+            args.sandbox or None, preload_from_env() if args.preload is None else args.preload.split(","),
+            memory_limit=args.memory_limit, time_limit=args.time_limit,
+        )
+        # Worker startup is not part of the run
+        sandbox.wait_ready()
+    stats = RunStats()
+    if args.worker:
+        executor = DistributedExecutor(
+            graph.nodes, connections, [parse_address(w) for w in args.worker],
+            timings=timings, journal=journal, stats=stats,
+        )
+    else:
+        executor = GraphExecutor(
+            graph.nodes, connections, timings=timings, journal=journal, sandbox=sandbox, stats=stats
+        )
+    try:
+        results = executor.run(targets=targets)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.worker:
+            executor.close()
+        if journal is not None:
+            journal.close()
+        if sandbox is not None:
+            sandbox.close()
+        graph.close()
+        try:
+            timings.save()
+        except OSError:
+            pass
+
+    history = RunHistory(history_path())
+    graph_id = graph_hash(graph.nodes)
+    try:
+        history.add(graph_id, graph.nodes, stats)
+        report = history.report(graph_id)
+    except sqlite3.Error as e:
+        print(f"Run history not updated: {e}", file=sys.stderr)
+        report = None
+    if report is not None and report.regressions:
+        print(
+            f"{len(report.regressions)} node(s) slower than usual; see 'report {args.graph}'", file=sys.stderr
+        )
+
+    _print_results(graph, executor.order(targets), results, targets, args.all)
+    return 0
+
+
+def _print_results(graph: Graph, order, results, targets, all_nodes: bool) -> None:
+    feeding = {c['start_node'] for c in graph.connections}
+    for nid in order:
+        if all_nodes or (nid in targets if targets else nid not in feeding):
+            node = graph.nodes[nid]
+            outs = ", ".join(f"{pin}={preview_text(v)}" for pin, v in results[nid].items())
+            print(f"{node.type} [{nid}]: {outs}", flush=True)
+
+
+def _cmd_watch(args) -> int:
+    graph = Graph()
+    unknown = graph.populate(iter_graph(args.graph))
+    if unknown:
+        print(f"Unknown node types: {', '.join(sorted(unknown))}", file=sys.stderr)
+
+    try:
+        return _watch(graph, args)
+    finally:
+        graph.close()
+
+
+def _watch(graph: Graph, args) -> int:
+    targets = [_find_node(graph, ref).id for ref in args.target] if args.target else None
+    if targets is None and args.outputs_only:
+        targets = output_nodes(graph.nodes) or None
+    timings = TimingStore(timings_path())
+    executor = GraphExecutor(graph.nodes, graph.connections, cache=ResultCache(max_bytes=budget_from_env()), timings=timings)
+    watcher = GraphWatcher(executor, targets, args.interval, args.debounce)
+    try:
+        results = watcher.run(targets)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    _print_results(graph, executor.order(targets), results, targets, args.all)
+    if not watcher.files.readers:
+        print("No files to watch: no node with the watch cache policy names an existing file", file=sys.stderr)
+        return 0
+    print(f"Watching {len(watcher.files.readers)} file(s); press Ctrl+C to stop", file=sys.stderr, flush=True)
+
+    def on_run(changed, order, results):
+        names = ", ".join(sorted(os.path.basename(path) for path in changed))
+        print(f"-- {names} changed; evaluated {len(order)} node(s)", file=sys.stderr, flush=True)
+        _print_results(graph, order, results, targets, args.all)
+        try:
+            timings.save()
+        except OSError:
+            pass
+
+    def on_error(error):
+        print(f"Error: {error}", file=sys.stderr, flush=True)
+
+    try:
+        watcher.loop(on_run, on_error)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _cmd_report(args) -> int:
+    graph = Graph()
+    graph.populate(iter_graph(args.graph))
+    report = RunHistory(history_path()).report(graph_hash(graph.nodes), args.window, args.threshold)
+    if report is None:
+        print("No recorded runs of this graph", file=sys.stderr)
+        return 1
+    for line in report.lines(args.all):
+        print(line)
+    return 1 if args.check and report.regressions else 0
+
+
+def _find_node(graph: Graph, ref: str):
+    if ref in graph.nodes:
+        return graph.nodes[ref]
+    matches = [n for n in graph.nodes.values() if n.type == ref or n.id.startswith(ref)]
+    if len(matches) != 1:
+        raise SystemExit(f"{'No' if not matches else 'More than one'} node matches {ref!r}; use its id")
+    return matches[0]
+
+
+def _cmd_sweep(args) -> int:
+    from .sweep import input_type, parse_values, run_sweep
+
+    graph = Graph()
+    graph.populate(iter_graph(args.graph))
+    grid = {}
+    for spec in args.param:
+        target, sep, values = spec.partition("=")
+        ref, dot, name = target.rpartition(".")
+        if not sep or not dot:
+            raise SystemExit(f"Invalid --param {spec!r}; expected NODE.INPUT=VALUES")
+        node = _find_node(graph, ref)
+        if name not in node.inputs:
+            raise SystemExit(f"{node.type} has no input {name!r}")
+        grid[(node.id, name)] = parse_values(values, input_type(node, name))
+
+    outputs = [_find_node(graph, ref).id for ref in args.output] if args.output else None
+    result = run_sweep(graph.nodes, graph.connections, grid, outputs, processes=args.processes)
+    if args.csv:
+        result.write_csv(args.csv)
+    else:
+        print("\t".join(result.columns))
+        for row in result.rows:
+            print("\t".join(preview_text(v) for v in row))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="pypernode")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker = commands.add_parser("worker", help="serve node execution for a coordinator")
+    worker.add_argument("--host", default="127.0.0.1", help="address to bind (default: %(default)s)")
+    worker.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (default: %(default)s)")
+    worker.set_defaults(func=_cmd_worker)
+
+    run = commands.add_parser("run", help="execute a saved graph without the GUI")
+    run.add_argument("graph", help="graph file (.ppng or .json)")
+    # Workers run node code in their own process; the sandbox is local only
+    placement = run.add_mutually_exclusive_group()
+    placement.add_argument(
+        "--worker", action="append", metavar="HOST:PORT",
+        help="run nodes on this worker; repeat for several workers",
+    )
+    run.add_argument("--all", action="store_true", help="print every evaluated node's result, not only the sinks")
+    run.add_argument(
+        "--target", action="append", metavar="NODE",
+        help="evaluate only this node and what it depends on; repeat for several",
+    )
+    run.add_argument(
+        "--outputs-only", action="store_true", help="evaluate only what the output nodes depend on",
+    )
+    run.add_argument(
+        "--checkpoint", action="store_true",
+        help="journal results to disk; an interrupted run resumes from them when run again",
+    )
+    placement.add_argument(
+        "--sandbox", type=int, nargs="?", const=0, metavar="N",
+        help="run node code in N sandbox processes (default: up to 4)",
+    )
+    run.add_argument("--preload", metavar="MODULES", help="comma separated modules the sandbox imports at startup")
+    run.add_argument("--memory-limit", metavar="SIZE", help="memory limit per sandbox process, e.g. 2GB")
+    run.add_argument("--time-limit", type=float, metavar="SECONDS", help="time limit per node in the sandbox")
+    run.set_defaults(func=_cmd_run)
+
+    watch = commands.add_parser("watch", help="run a graph, then again whenever the files it reads change")
+    watch.add_argument("graph", help="graph file (.ppng or .json)")
+    watch.add_argument("--all", action="store_true", help="print every evaluated node's result, not only the sinks")
+    watch.add_argument(
+        "--target", action="append", metavar="NODE",
+        help="evaluate only this node and what it depends on; repeat for several",
+    )
+    watch.add_argument(
+        "--outputs-only", action="store_true", help="evaluate only what the output nodes depend on",
+    )
+    watch.add_argument(
+        "--interval", type=float, default=0.5, metavar="SECONDS", help="how often files are checked (default: %(default)s)",
+    )
+    watch.add_argument(
+        "--debounce", type=float, default=0.3, metavar="SECONDS",
+        help="wait until files are quiet this long before running (default: %(default)s)",
+    )
+    watch.set_defaults(func=_cmd_watch)
+
+    report = commands.add_parser("report", help="compare the latest run of a graph with its run history")
+    report.add_argument("graph", help="graph file (.ppng or .json)")
+    report.add_argument(
+        "--window", type=int, default=10, metavar="N",
+        help="baseline: median of the N runs before the latest (default: %(default)s)",
+    )
+    report.add_argument(
+        "--threshold", type=float, default=0.5,
+        help="flag nodes more than this fraction slower than the baseline (default: %(default)s)",
+    )
+    report.add_argument("--all", action="store_true", help="list every executed node, not only regressions")
+    report.add_argument("--check", action="store_true", help="exit with status 1 when a node regressed")
+    report.set_defaults(func=_cmd_report)
+
+    serve = commands.add_parser("serve", help="serve graph execution over HTTP/JSON-RPC")
+    serve.add_argument("--host", default="127.0.0.1", help="address to bind (default: %(default)s)")
+    serve.add_argument("--port", type=int, default=8080, help="port to listen on (default: %(default)s)")
+    serve.add_argument(
+        "--graph", action="append", metavar="[NAME=]PATH",
+        help="load a graph at startup; repeat for several graphs",
+    )
+    serve.set_defaults(func=_cmd_serve)
+
+    sweep = commands.add_parser("sweep", help="run a graph over a grid of input values")
+    sweep.add_argument("graph", help="graph file (.ppng or .json)")
+    sweep.add_argument(
+        "--param", action="append", required=True, metavar="NODE.INPUT=VALUES",
+        help="input to sweep; NODE is a node id (or unique prefix/type), VALUES is "
+             "'1,2,3' or 'start:stop:step'; repeat for a grid",
+    )
+    sweep.add_argument("--output", action="append", metavar="NODE", help="node whose results to collect (default: sinks)")
+    sweep.add_argument("--processes", type=int, default=None, help="worker processes (default: CPU count, 0: none)")
+    sweep.add_argument("--csv", metavar="PATH", help="write the result table to a CSV file")
+    sweep.set_defaults(func=_cmd_sweep)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
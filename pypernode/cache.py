@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .policies import parse_size
+from .values import approx_size
+
+
+class ResultCache:
+    """Node outputs keyed by node cache key, shared by every node with that key.
+
+    Keys describe a node's code and the keys/values of its inputs (see
+    GraphExecutor), so identical nodes anywhere in a graph, and across runs,
+    map to the same entry. The cache is the only place outputs are kept after
+    a run (NodeData refers to its entry), so its limits bound the memory of
+    results. The least recently used entries are dropped once their
+    approximate size (see values.approx_size) exceeds ``max_bytes``, or, if
+    given, there are more than ``max_entries``; a node whose entry is gone is
+    simply recomputed. One cache (and so one budget) is meant to be shared by
+    everything a process runs: groups, map nodes and sweeps included.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Dict[str, object], float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Dict[str, object]]:
+        """Cached outputs for ``key``; with ``max_age``, only if stored less than
+        that many seconds ago."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            outputs, stored, size = entry
+            if max_age is not None and time.monotonic() - stored > max_age:
+                del self._entries[key]
+                self.total_bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return outputs
+
+    def peek(self, key: str) -> Optional[Dict[str, object]]:
+        """Cached outputs for ``key`` without counting as a use."""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key: str, outputs: Dict[str, object]) -> None:
+        size = sum(approx_size(v) for v in outputs.values())
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Would evict everything else and still not fit
+            self.discard(key)
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[2]
+            self._entries[key] = (outputs, time.monotonic(), size)
+            self.total_bytes += size
+            while (self.max_entries is not None and len(self._entries) > self.max_entries) or (
+                self.max_bytes is not None and self.total_bytes > self.max_bytes
+            ):
+                self.total_bytes -= self._entries.popitem(last=False)[1][2]
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[2]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+def budget_from_env(default: str = "1GB") -> Optional[int]:
+    """Memory budget for results: ``$PYPERNODE_CACHE_BUDGET`` (e.g. ``512MB``,
+    ``0`` for no limit) or ``default``."""
+    size = parse_size(os.environ.get("PYPERNODE_CACHE_BUDGET", default))
+    return size or None
@@ -0,0 +1,350 @@
+"""Running a graph on several machines.
+
+A worker daemon (``python -m pypernode worker``) executes single nodes for a
+coordinator. The coordinator (DistributedExecutor) schedules nodes as their
+inputs become ready, on whichever idle worker already holds most of those
+inputs. Results come back to the coordinator and are kept in its
+ResultCache; cache hits and duplicate nodes never leave the coordinator.
+
+Everything is addressed by hash. A task names the node's code hash and the
+content address of each input (see engine.input_keys), and only carries code
+and values the worker is not known to hold. A worker that is missing
+something answers with what it needs, and the coordinator sends it.
+
+Messages are pickles behind an 8-byte length prefix, and workers execute
+whatever code they are sent, so only run workers on trusted networks.
+"""
+
+import heapq
+import itertools
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .cache import ResultCache, budget_from_env
+from .engine import GraphExecutor, content_key, input_keys
+from .interpreter import parse_function_cached
+from .models import NodeData
+from .timings import remaining_paths
+
+DEFAULT_PORT = 8765
+
+_HEADER = struct.Struct("<Q")
+
+
+def send_message(sock: socket.socket, message: object) -> None:
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(min(size - len(buf), 1 << 20))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_message(sock: socket.socket) -> Optional[object]:
+    """Next message from ``sock``, or None once the peer has closed it."""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    payload = _recv_exact(sock, _HEADER.unpack(header)[0])
+    if payload is None:
+        return None
+    return pickle.loads(payload)
+
+
+def parse_address(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(":")
+    if not host:
+        return text, DEFAULT_PORT
+    return host, int(port)
+
+
+class Worker:
+    """State of a worker daemon: code, received values and its own results."""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.nodes: Dict[str, NodeData] = {}
+        # Received values (under "value:" + address) and results share one budget
+        self.cache = ResultCache(max_bytes=max_bytes or budget_from_env())
+        self._lock = threading.Lock()
+
+    def _lookup(self, address: str):
+        entry = self.cache.get("value:" + address)
+        if entry is not None:
+            return True, entry['value']
+        key, _, pin = address.rpartition(":")
+        outs = self.cache.get(key) if key else None
+        if outs is not None and pin in outs:
+            return True, outs[pin]
+        return False, None
+
+    def handle(self, message: Dict[str, object]) -> Dict[str, object]:
+        op = message.get('op')
+        if op == 'ping':
+            return {'status': 'ok'}
+        if op != 'run':
+            return {'status': 'error', 'error': f"Unknown operation: {op}"}
+
+        code_hash = message['code_hash']
+        for address, value in message.get('values', {}).items():
+            self.cache.put("value:" + address, {'value': value})
+        if 'code' in message and code_hash not in self.nodes:
+            try:
+                node = NodeData(parse_function_cached(message['code']))
+            except Exception as e:
+                return {'status': 'error', 'error': str(e)}
+            with self._lock:
+                self.nodes[code_hash] = node
+
+        inputs, missing = {}, []
+        for name, address in message['inputs'].items():
+            found, value = self._lookup(address)
+            if found:
+                inputs[name] = value
+            else:
+                missing.append(address)
+        node = self.nodes.get(code_hash)
+        if node is None or missing:
+            return {'status': 'missing', 'code': node is None, 'addresses': missing}
+
+        try:
+            outs = node.execute(inputs, cache=self.cache)
+        except Exception as e:
+            return {'status': 'error', 'error': str(e)}
+        self.cache.put(message['key'], outs)
+        return {'status': 'ok', 'outputs': outs}
+
+
+class _WorkerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            message = recv_message(self.request)
+            if message is None:
+                return
+            send_message(self.request, self.server.worker.handle(message))
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, worker: Optional[Worker] = None):
+        super().__init__((host, port), _WorkerHandler)
+        self.worker = worker or Worker()
+
+
+class RemoteWorker:
+    """Coordinator-side connection to one worker, with what it is known to hold."""
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.codes: Set[str] = set()
+        self.held: Set[str] = set()
+        self._sock: Optional[socket.socket] = None
+
+    def __repr__(self):
+        return f"RemoteWorker({self.host}:{self.port})"
+
+    def request(self, message: Dict[str, object]) -> Dict[str, object]:
+        if self._sock is None:
+            self._sock = socket.create_connection((self.host, self.port))
+        try:
+            send_message(self._sock, message)
+            reply = recv_message(self._sock)
+        except OSError:
+            self.close()
+            raise
+        if reply is None:
+            self.close()
+            raise ConnectionError(f"Worker {self.host}:{self.port} closed the connection")
+        return reply
+
+    def run_node(self, node: NodeData, key: str, addresses: Dict[str, str], values: Dict[str, object]) -> Dict[str, object]:
+        message = {
+            'op': 'run',
+            'key': key,
+            'code_hash': node.code_hash,
+            'inputs': addresses,
+            'values': {a: v for a, v in values.items() if a not in self.held},
+        }
+        if node.code_hash not in self.codes:
+            message['code'] = node.code
+        reply = self.request(message)
+        if reply['status'] == 'missing':
+            # The worker dropped something we thought it held
+            message['values'] = {a: values[a] for a in reply['addresses']}
+            message['code'] = node.code
+            reply = self.request(message)
+        if reply['status'] != 'ok':
+            raise RuntimeError(reply.get('error') or f"Worker could not run {node.type}")
+
+        outs = reply['outputs']
+        self.codes.add(node.code_hash)
+        self.held.update(addresses.values())
+        self.held.update(f"{key}:{pin}" for pin in outs)
+        return outs
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class DistributedExecutor(GraphExecutor):
+    """GraphExecutor that runs each node on a remote worker.
+
+    Accepts the same callbacks, cache, timings, journal and stats as
+    GraphExecutor.
+    Chains are not fused, since every node is a separate task. Ready nodes
+    start in order of their longest remaining path to a sink, by recorded
+    timings.
+    """
+
+    def __init__(
+        self,
+        nodes: Dict[str, NodeData],
+        connections: List[Dict[str, object]],
+        workers: Iterable[Tuple[str, int]],
+        **kwargs,
+    ):
+        kwargs['fuse'] = False
+        super().__init__(nodes, connections, **kwargs)
+        self.workers = [RemoteWorker(host, port) for host, port in workers]
+        if not self.workers:
+            raise ValueError("DistributedExecutor needs at least one worker")
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.close()
+
+    @staticmethod
+    def _pick(idle: List[RemoteWorker], addresses: Dict[str, str]) -> RemoteWorker:
+        return max(idle, key=lambda w: sum(a in w.held for a in addresses.values()))
+
+    def run(
+        self,
+        overrides: Optional[Dict[str, Dict[str, object]]] = None,
+        targets: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Dict[str, object]]:
+        plan = self.plan
+        overrides = overrides or {}
+        order = self.order(targets)
+        keys: Dict[str, str] = {}
+        first: Dict[str, str] = {}
+        node_keys: Dict[str, str] = {}
+        results_cache: Dict[str, Dict[str, object]] = {}
+
+        upstream = {nid: {src for src, _ in plan.input_map[nid].values()} for nid in order}
+        waiting = {nid: len(srcs) for nid, srcs in upstream.items()}
+        dependents = defaultdict(set)
+        for nid, srcs in upstream.items():
+            for src in srcs:
+                dependents[src].add(nid)
+
+        durations, _ = self.expected_durations(overrides, targets)
+        priority = remaining_paths(order, dependents, durations)
+        tiebreak = itertools.count()
+        ready: List[Tuple[float, int, str]] = []
+
+        def make_ready(nid: str) -> None:
+            heapq.heappush(ready, (-priority[nid], next(tiebreak), nid))
+
+        for nid in order:
+            if not waiting[nid]:
+                make_ready(nid)
+        parked: Dict[str, List[str]] = defaultdict(list)
+        idle = list(self.workers)
+        running = {}
+
+        def finish(nid: str, outs: Dict[str, object], cached: bool) -> None:
+            key = node_keys[nid]
+            keys[nid] = content_key(outs) if self.nodes[nid].definition.cache_policy.volatile else key
+            self._record(nid, key, outs, results_cache)
+            if self.on_node_completed:
+                self.on_node_completed(nid, outs, cached)
+            for dup in parked.pop(nid, []):
+                finish(dup, outs, True)
+            for nxt in dependents[nid]:
+                waiting[nxt] -= 1
+                if not waiting[nxt]:
+                    make_ready(nxt)
+
+        with ThreadPoolExecutor(max_workers=len(self.workers)) as pool:
+            while ready or running:
+                while ready:
+                    entry = heapq.heappop(ready)
+                    nid = entry[2]
+                    node = self.nodes[nid]
+                    policy = node.definition.cache_policy
+                    if nid not in node_keys:
+                        node_keys[nid] = self.node_key(nid, keys, overrides, results_cache)
+                    key = node_keys[nid]
+                    rep = first.setdefault(key, nid) if policy.shareable else nid
+                    if rep != nid:
+                        if rep in results_cache:
+                            finish(nid, results_cache[rep], True)
+                        else:
+                            parked[rep].append(nid)
+                        continue
+                    outs = self.lookup(key, policy)
+                    if outs is not None:
+                        if self.on_node_started:
+                            self.on_node_started(nid)
+                        finish(nid, outs, True)
+                        continue
+                    if not idle:
+                        heapq.heappush(ready, entry)
+                        break
+
+                    addresses = input_keys(nid, node, plan, keys, overrides)
+                    inputs = self._resolve_inputs(nid, overrides, results_cache)
+                    values = {addresses[name]: value for name, value in inputs.items()}
+                    worker = self._pick(idle, addresses)
+                    idle.remove(worker)
+                    if self.on_node_started:
+                        self.on_node_started(nid)
+                    future = pool.submit(worker.run_node, node, key, addresses, values)
+                    running[future] = (nid, worker, inputs, time.perf_counter())
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    nid, worker, inputs, start = running.pop(future)
+                    idle.append(worker)
+                    try:
+                        outs = future.result()
+                    except Exception as e:
+                        self._fail(nid, e)
+                        wait(running)
+                        raise
+                    # Includes the transfer, which is part of what scheduling has to wait for
+                    self._timed(nid, inputs, time.perf_counter() - start)
+                    self.store(node_keys[nid], outs, self.nodes[nid].definition.cache_policy)
+                    finish(nid, outs, False)
+
+        self._finish_run()
+        return results_cache
+
+
+def serve_worker(host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> None:
+    with WorkerServer(host, port) as server:
+        bound_host, bound_port = server.server_address[:2]
+        print(f"pypernode worker listening on {bound_host}:{bound_port}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -1,9 +1,15 @@
-import time
-from typing import Dict, List
+import sqlite3
+from typing import Dict, List, Optional, Sequence
 
 from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
 
-from .models import NodeData
+from .cache import ResultCache
+from .engine import GraphExecutor
+from .history import RunHistory, RunStats, graph_hash
+from .journal import RunJournal
+from .sandbox import SandboxPool
+from .models import NodeData, snapshot
+from .timings import TimingStore
 
 
 class WorkerSignals(QObject):
@@ -11,84 +17,121 @@ class WorkerSignals(QObject):
     error = pyqtSignal(str)
     node_started = pyqtSignal(str)
     node_completed = pyqtSignal(str, object)
+    chain_completed = pyqtSignal(object)
+    node_progress = pyqtSignal(str, int, int)
     node_error = pyqtSignal(str, str)
+    # Report of the run against the history, and the ids of the nodes it evaluated
+    history_updated = pyqtSignal(object, object)
 
 
 class ExecutionWorker(QRunnable):
-    def __init__(self, nodes: Dict[str, NodeData], connections: List[Dict[str, object]]):
+    """Runs a graph on a pool thread, on snapshots of its nodes.
+
+    The worker is created on the UI thread, where it copies the nodes (see
+    NodeData.snapshot); the run only ever touches the copies. Each node's
+    outcome is committed to the live node on the UI thread, by slots that
+    are connected before any other receiver of the signals. So the graph can
+    be edited while a run is in progress, and concurrent runs never write to
+    the same NodeData; they only share the (thread-safe) result cache.
+    """
+
+    def __init__(
+        self,
+        nodes: Dict[str, NodeData],
+        connections: List[Dict[str, object]],
+        cache: Optional[ResultCache] = None,
+        timings: Optional[TimingStore] = None,
+        targets: Optional[Sequence[str]] = None,
+        journal: Optional[RunJournal] = None,
+        sandbox: Optional[SandboxPool] = None,
+        history: Optional[RunHistory] = None,
+    ):
         super().__init__()
-        self.nodes = nodes
+        self.live = nodes
+        self.nodes = snapshot(nodes)
+        self._committed = {nid: node._output_version for nid, node in self.nodes.items()}
         self.connections = connections
+        self.cache = cache
+        self.timings = timings
+        self.targets = targets
+        self.journal = journal
+        self.sandbox = sandbox
+        self.history = history
         self.signals = WorkerSignals()
+        # Lambdas, since PyQt holds bound methods weakly and the pool deletes the
+        # worker before its queued signals are delivered
+        self.signals.node_completed.connect(lambda nid, _: self._commit_node(nid))
+        self.signals.chain_completed.connect(lambda ids: self._commit_chain(ids))
+        self.signals.node_error.connect(lambda nid, _: self._commit_node(nid))
+        self.signals.finished.connect(lambda: self._commit_rest())
+        self.signals.error.connect(lambda _: self._commit_rest())
 
     def run(self):
+        stats = RunStats() if self.history is not None else None
+        executor = GraphExecutor(
+            self.nodes,
+            self.connections,
+            on_node_started=self.signals.node_started.emit,
+            on_node_completed=self._on_node_completed,
+            on_chain_completed=self._on_chain_completed,
+            on_node_error=self.signals.node_error.emit,
+            cache=self.cache,
+            timings=self.timings,
+            journal=self.journal,
+            sandbox=self.sandbox,
+            on_node_progress=self.signals.node_progress.emit,
+            stats=stats,
+        )
         try:
-            adj = {n: [] for n in self.nodes}
-            in_degree = {n: 0 for n in self.nodes}
-            input_map = {n: {} for n in self.nodes}
-
-            for conn in self.connections:
-                start_node, end_node = conn['start_node'], conn['end_node']
-                try:
-                    s_node = self.nodes[start_node]
-                    e_node = self.nodes[end_node]
-                    src_pin = s_node.outputs[conn['start_socket']]
-                    tgt_pin = e_node.inputs[conn['end_socket']]
-
-                    adj[start_node].append(end_node)
-                    in_degree[end_node] += 1
-                    input_map[end_node][tgt_pin] = (start_node, src_pin)
-                except Exception:
-                    continue
-
-            queue = [n for n in self.nodes if in_degree[n] == 0]
-            sorted_nodes = []
-            while queue:
-                u = queue.pop(0)
-                sorted_nodes.append(u)
-                for v in adj[u]:
-                    in_degree[v] -= 1
-                    if in_degree[v] == 0:
-                        queue.append(v)
-
-            if len(sorted_nodes) != len(self.nodes):
-                raise Exception("Cycle detected! Graph must be acyclic.")
-
-            results_cache: Dict[str, Dict[str, object]] = {}
-            for nid in sorted_nodes:
-                node = self.nodes[nid]
-                self.signals.node_started.emit(nid)
-
-                node_inputs = {}
-                for socket in node.input_defs:
-                    in_name = socket.name
-                    if in_name in input_map[nid]:
-                        src_id, src_pin = input_map[nid][in_name]
-                        node_inputs[in_name] = results_cache.get(src_id, {}).get(src_pin, socket.type.default_value())
-                    else:
-                        node_inputs[in_name] = node.params.get(in_name, socket.default)
-
-                cur_hash = node.compute_hash(node_inputs)
-                if node.cache_hash == cur_hash and not node.last_error and node.last_output:
-                    results_cache[nid] = node.last_output
-                    self.signals.node_completed.emit(nid, node.last_output)
-                    time.sleep(0.05)
-                    continue
-
-                try:
-                    outs = node.execute(node_inputs)
-                    results_cache[nid] = outs
-                    node.last_output = outs
-                    node.last_error = None
-                    node.cache_hash = cur_hash
-                    self.signals.node_completed.emit(nid, outs)
-                except Exception as e:
-                    node.last_error = str(e)
-                    self.signals.node_error.emit(nid, str(e))
-                    raise e
-
-                time.sleep(0.1)
-
+            executor.run(targets=self.targets)
+            if stats is not None:
+                self._update_history(stats)
             self.signals.finished.emit()
         except Exception as e:
             self.signals.error.emit(str(e))
+        finally:
+            if self.journal is not None:
+                self.journal.close()
+            if self.timings is not None:
+                try:
+                    self.timings.save()
+                except OSError:
+                    pass
+
+    def _update_history(self, stats: RunStats) -> None:
+        graph = graph_hash(self.nodes)
+        try:
+            self.history.add(graph, self.nodes, stats)
+            report = self.history.report(graph)
+        except sqlite3.Error:
+            return
+        if report is not None:
+            self.signals.history_updated.emit(report, stats.evaluated)
+
+    def _commit_node(self, nid: str) -> None:
+        snapshot = self.nodes[nid]
+        self._committed[nid] = snapshot._output_version
+        live = self.live.get(nid)
+        if live is not None:
+            live.commit(snapshot)
+
+    def _commit_chain(self, ids: List[str]) -> None:
+        for nid in ids:
+            self._commit_node(nid)
+
+    def _commit_rest(self) -> None:
+        # Results recorded without a signal, such as the finished part of a failed chain
+        for nid, node in self.nodes.items():
+            if node._output_version != self._committed[nid]:
+                self._commit_node(nid)
+
+    def _on_node_completed(self, nid: str, outs: Dict[str, object], cached: bool) -> None:
+        # Previews are built here so the UI thread never formats a full value
+        self.nodes[nid].previews()
+        self.signals.node_completed.emit(nid, outs)
+
+    def _on_chain_completed(self, ids: List[str], cached: bool) -> None:
+        # One signal per fused chain; each node's result is on NodeData.last_output
+        for nid in ids:
+            self.nodes[nid].previews()
+        self.signals.chain_completed.emit(ids)
@@ -0,0 +1,101 @@
+"""Fusion of linear node chains into one generated function.
+
+A chain is a maximal path ``a -> b -> c`` in which every node except the
+last feeds exactly one connection, every node except the first is fed only
+by its predecessor, and every member is a plain (non-group) node with the
+default ``always`` cache policy. Such a chain runs as a single
+call with no scheduling in between; the remaining inputs of each member come
+in as plain arguments.
+"""
+
+import threading
+from typing import Callable, Dict, List, Tuple
+
+from .values import share
+
+_FUSED_CACHE_LIMIT = 256
+_fused_cache: Dict[Tuple, Callable] = {}
+_fused_lock = threading.Lock()
+
+
+def _fusable(node) -> bool:
+    return not node.is_group and len(node.outputs) == 1 and node.definition.cache_policy.mode == "always"
+
+
+def find_chains(nodes, plan) -> Dict[str, List[str]]:
+    """Chains of at least two nodes, keyed by their head."""
+
+    def successor(nid: str):
+        if len(plan.adj[nid]) != 1:
+            return None
+        nxt = plan.adj[nid][0]
+        if len(plan.input_map[nxt]) != 1 or not _fusable(nodes[nxt]):
+            return None
+        return nxt
+
+    has_chain_parent = set()
+    for nid in plan.order:
+        if _fusable(nodes[nid]):
+            nxt = successor(nid)
+            if nxt is not None:
+                has_chain_parent.add(nxt)
+
+    chains = {}
+    for nid in plan.order:
+        if not _fusable(nodes[nid]) or nid in has_chain_parent:
+            continue
+        chain = [nid]
+        nxt = successor(nid)
+        while nxt is not None:
+            chain.append(nxt)
+            nxt = successor(nxt)
+        if len(chain) > 1:
+            chains[nid] = chain
+    return chains
+
+
+def chain_shape(nodes, plan, chain: List[str]) -> Tuple:
+    """Per member, its input names and the input linked to the previous member."""
+    shape = []
+    for idx, nid in enumerate(chain):
+        linked = next(iter(plan.input_map[nid])) if idx else None
+        shape.append((tuple(nodes[nid].inputs), linked))
+    return tuple(shape)
+
+
+def _generate(shape: Tuple) -> Callable:
+    lines, namespace, arg_names = [], {"_share": share}, []
+    for k, (inputs, linked) in enumerate(shape):
+        kwargs = []
+        for name in inputs:
+            if name == linked:
+                kwargs.append(f"{name}=_out[-1]")
+            else:
+                arg = f"a{len(arg_names)}"
+                arg_names.append(arg)
+                kwargs.append(f"{name}={arg}")
+        lines.append(f"    _out.append(_share(f{k}({', '.join(kwargs)})))")
+    source = f"def _fused(_out, {', '.join(['f' + str(k) for k in range(len(shape))] + arg_names)}):\n"
+    source += "\n".join(lines) + "\n"
+    exec(compile(source, "<fused chain>", "exec"), namespace)
+    return namespace["_fused"]
+
+
+def fused_callable(shape: Tuple) -> Callable:
+    """Generated function for a chain shape, compiled once per shape.
+
+    ``shape`` holds one ``(input_names, linked_input)`` entry per member;
+    ``linked_input`` is the input fed by the previous member (None for the
+    head). The function takes an output list, then the member functions,
+    then the remaining inputs in order, and appends each member's result to
+    the list. If a member raises, the list tells how far the chain got.
+    """
+
+    func = _fused_cache.get(shape)
+    if func is None:
+        func = _generate(shape)
+        with _fused_lock:
+            if len(_fused_cache) >= _FUSED_CACHE_LIMIT:
+                _fused_cache.pop(next(iter(_fused_cache)))
+            _fused_cache[shape] = func
+    return func
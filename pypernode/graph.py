@@ -0,0 +1,172 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import graph_io
+from .interpreter import parse_function_cached
+from .library import NodeLibrary
+from .models import NodeData
+from .node_types import ValueType
+
+
+ConnectionKey = Tuple[str, int, str, int]
+
+
+def connection_key(conn: Dict[str, object]) -> ConnectionKey:
+    return conn['start_node'], conn['start_socket'], conn['end_node'], conn['end_socket']
+
+
+def coerce_value(value_type: ValueType, val):
+    """Convert a value read from a file or form (usually a string) to ``value_type``."""
+    if value_type == ValueType.NUMBER and isinstance(val, str):
+        try:
+            return float(val)
+        except Exception:
+            return val
+    if value_type == ValueType.BOOLEAN and isinstance(val, str):
+        return val.lower() in ("true", "1", "yes")
+    if value_type == ValueType.DATE and isinstance(val, str):
+        try:
+            return date.fromisoformat(val)
+        except Exception:
+            return val
+    return val
+
+
+def _coerce_params(node: NodeData) -> None:
+    for sock in node.input_defs:
+        if sock.name in node.params:
+            node.params[sock.name] = coerce_value(sock.type, node.params[sock.name])
+
+
+class Graph:
+    """The node graph as plain data, independent of any scene or view."""
+
+    def __init__(self):
+        self.nodes: Dict[str, NodeData] = {}
+        self._connections: Dict[ConnectionKey, Dict[str, object]] = {}
+        self._by_node: Dict[str, Dict[ConnectionKey, Dict[str, object]]] = defaultdict(dict)
+
+    @property
+    def connections(self) -> List[Dict[str, object]]:
+        return list(self._connections.values())
+
+    def create_node(self, type_name, x, y, id=None, params=None, code=None) -> Optional[NodeData]:
+        definition = None
+        if code:
+            try:
+                definition = parse_function_cached(code)
+            except Exception:
+                pass
+
+        if definition is None:
+            definition = NodeLibrary.get_definition(type_name)
+
+        if definition is None:
+            return None
+
+        node = NodeData(definition, x, y, id)
+        if params:
+            node.params.update(params)
+        if code:
+            node.code = code
+        _coerce_params(node)
+
+        self.nodes[node.id] = node
+        return node
+
+    def remove_node(self, nid: str) -> List[Dict[str, object]]:
+        removed = self.connections_of(nid)
+        for c in removed:
+            self.remove_connection(c)
+        self._by_node.pop(nid, None)
+        self.nodes.pop(nid, None)
+        return removed
+
+    def add_connection(self, start_node, start_socket, end_node, end_socket) -> Optional[Dict[str, object]]:
+        conn = {
+            'start_node': start_node,
+            'start_socket': start_socket,
+            'end_node': end_node,
+            'end_socket': end_socket,
+        }
+        key = connection_key(conn)
+        if key in self._connections or not self._is_valid(conn):
+            return None
+        self._connections[key] = conn
+        self._by_node[start_node][key] = conn
+        self._by_node[end_node][key] = conn
+        return conn
+
+    def remove_connection(self, conn: Dict[str, object]) -> None:
+        key = connection_key(conn)
+        if self._connections.pop(key, None) is None:
+            return
+        for nid in (conn['start_node'], conn['end_node']):
+            self._by_node[nid].pop(key, None)
+
+    def connections_of(self, nid: str) -> List[Dict[str, object]]:
+        return list(self._by_node.get(nid, {}).values())
+
+    def prune_connections(self, nid: str) -> List[Dict[str, object]]:
+        """Drop connections of a node that no longer match its sockets."""
+        invalid = [c for c in self.connections_of(nid) if not self._is_valid(c)]
+        for c in invalid:
+            self.remove_connection(c)
+        return invalid
+
+    def _is_valid(self, conn: Dict[str, object]) -> bool:
+        s_node = self.nodes.get(conn['start_node'])
+        e_node = self.nodes.get(conn['end_node'])
+        if s_node is None or e_node is None:
+            return False
+        if not (0 <= conn['start_socket'] < len(s_node.output_defs)):
+            return False
+        if not (0 <= conn['end_socket'] < len(e_node.input_defs)):
+            return False
+        src_type = s_node.output_defs[conn['start_socket']].type
+        return src_type.is_compatible_with(e_node.input_defs[conn['end_socket']].type)
+
+    def close(self) -> None:
+        """Release what the nodes hold on to for running (see NodeData.close)."""
+        for node in self.nodes.values():
+            node.close()
+
+    def clear(self) -> None:
+        self.close()
+        self.nodes = {}
+        self._connections = {}
+        self._by_node = defaultdict(dict)
+
+    def populate(self, records: Iterable[Tuple[str, Dict[str, object]]]) -> List[str]:
+        """Add records from graph_io; returns the types that could not be resolved."""
+        unknown = []
+        for kind, rec in records:
+            if kind == 'node':
+                node = self.create_node(rec['type'], rec['x'], rec['y'], rec['id'], rec['params'], rec.get('code'))
+                if node is None:
+                    unknown.append(rec['type'])
+            else:
+                self.add_connection(rec['start_node'], rec['start_socket'], rec['end_node'], rec['end_socket'])
+        return unknown
+
+    def to_data(self) -> Dict[str, list]:
+        return {
+            "nodes": [
+                {
+                    "id": n.id, "type": n.type, "x": n.x, "y": n.y,
+                    "params": graph_io.encode_params(n.params), "code": n.code,
+                }
+                for n in self.nodes.values()
+            ],
+            "connections": [dict(c) for c in self._connections.values()],
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "Graph":
+        graph = cls()
+        graph.populate(graph_io.iter_graph(path))
+        return graph
+
+    def save(self, path: str) -> None:
+        graph_io.save_graph(path, self.to_data())
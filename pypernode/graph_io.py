@@ -0,0 +1,163 @@
+"""Reading and writing graph files without depending on Qt.
+
+A graph is exchanged as plain data::
+
+    {"nodes": [{"id", "type", "x", "y", "params", "code"}, ...],
+     "connections": [{"start_node", "start_socket", "end_node", "end_socket"}, ...]}
+
+Two on-disk encodings are supported: indented JSON for interoperability and a
+compact binary format (``.ppng``). The binary file is a short header followed
+by a zlib stream of length-prefixed records. Every distinct code body is
+written once and referenced by index, and connections are packed as integers,
+so the file can be decoded record by record while the graph is being built.
+"""
+
+import json
+import struct
+import zlib
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from .interpreter import code_hash
+
+MAGIC = b"PPNG"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sH")
+_RECORD = struct.Struct("<BI")
+_EDGE = struct.Struct("<IIII")
+_HASH_LEN = 40
+
+REC_CODE = 1
+REC_NODE = 2
+REC_EDGE = 3
+
+_CHUNK_SIZE = 1 << 20
+
+
+def encode_params(params: Dict[str, object]) -> Dict[str, object]:
+    return {k: (v.isoformat() if isinstance(v, date) else v) for k, v in params.items()}
+
+
+def is_binary_graph(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def save_json(path: str, data: Dict[str, list]) -> None:
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def load_json(path: str) -> Dict[str, list]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_binary(path: str, nodes: Iterable[Dict[str, object]], connections: Iterable[Dict[str, object]]) -> None:
+    compressor = zlib.compressobj(6)
+    code_index: Dict[str, int] = {}
+    node_index: Dict[str, int] = {}
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+
+        def write_record(kind: int, payload: bytes) -> None:
+            f.write(compressor.compress(_RECORD.pack(kind, len(payload)) + payload))
+
+        for n in nodes:
+            code = n.get('code') or ""
+            h = code_hash(code)
+            if h not in code_index:
+                code_index[h] = len(code_index)
+                write_record(REC_CODE, h.encode('ascii') + code.encode('utf-8'))
+            node_index[n['id']] = len(node_index)
+            record = [n['id'], n['type'], n['x'], n['y'], code_index[h], encode_params(n.get('params', {}))]
+            write_record(REC_NODE, json.dumps(record, separators=(',', ':'), default=str).encode('utf-8'))
+
+        for c in connections:
+            try:
+                packed = _EDGE.pack(
+                    node_index[c['start_node']], c['start_socket'], node_index[c['end_node']], c['end_socket']
+                )
+            except KeyError:
+                continue
+            write_record(REC_EDGE, packed)
+
+        f.write(compressor.flush())
+
+
+def iter_binary(path: str) -> Iterator[Tuple[str, Dict[str, object]]]:
+    """Yield ('node', dict) and ('connection', dict) records as they are decoded."""
+
+    codes: List[Tuple[str, str]] = []
+    node_ids: List[str] = []
+    decompressor = zlib.decompressobj()
+    buf = b""
+
+    with open(path, 'rb') as f:
+        magic, version = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a PyPerNode graph file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph file version {version}")
+
+        while True:
+            chunk = f.read(_CHUNK_SIZE)
+            buf += decompressor.decompress(chunk) if chunk else decompressor.flush()
+            pos = 0
+            while len(buf) - pos >= _RECORD.size:
+                kind, length = _RECORD.unpack_from(buf, pos)
+                start = pos + _RECORD.size
+                if len(buf) - start < length:
+                    break
+                payload = buf[start:start + length]
+                pos = start + length
+
+                if kind == REC_CODE:
+                    codes.append((payload[:_HASH_LEN].decode('ascii'), payload[_HASH_LEN:].decode('utf-8')))
+                elif kind == REC_NODE:
+                    nid, type_name, x, y, code_idx, params = json.loads(payload)
+                    node_ids.append(nid)
+                    h, code = codes[code_idx]
+                    yield 'node', {
+                        "id": nid, "type": type_name, "x": x, "y": y,
+                        "params": params, "code": code, "code_hash": h,
+                    }
+                elif kind == REC_EDGE:
+                    s_idx, s_sock, e_idx, e_sock = _EDGE.unpack(payload)
+                    yield 'connection', {
+                        "start_node": node_ids[s_idx], "start_socket": s_sock,
+                        "end_node": node_ids[e_idx], "end_socket": e_sock,
+                    }
+            buf = buf[pos:]
+            if not chunk:
+                break
+
+    if buf:
+        raise ValueError(f"{path} is truncated")
+
+
+def iter_graph(path: str) -> Iterator[Tuple[str, Dict[str, object]]]:
+    if is_binary_graph(path):
+        yield from iter_binary(path)
+        return
+    data = load_json(path)
+    for n in data.get('nodes', []):
+        yield 'node', n
+    for c in data.get('connections', []):
+        yield 'connection', c
+
+
+def load_graph(path: str) -> Dict[str, list]:
+    data: Dict[str, list] = {"nodes": [], "connections": []}
+    for kind, record in iter_graph(path):
+        data["nodes" if kind == 'node' else "connections"].append(record)
+    return data
+
+
+def save_graph(path: str, data: Dict[str, list]) -> None:
+    if path.lower().endswith('.json'):
+        save_json(path, data)
+    else:
+        save_binary(path, data['nodes'], data['connections'])
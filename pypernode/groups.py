@@ -0,0 +1,308 @@
+"""Group nodes: a subgraph collapsed into a single node.
+
+A group is stored as node code like any other node: a header comment followed
+by canonical JSON with the inner nodes, their connections and the boundary
+sockets. Inner code bodies are kept once in a table keyed by their hash and
+nodes reference them by hash, so the group text (and therefore its code hash)
+is a Merkle key over everything inside the group.
+
+A group can also be a map node: its document then names one input under
+``map``, that input takes a collection, and the subgraph is applied to every
+element (see mapping.MapRunner); each output becomes a list.
+"""
+
+import json
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import graph_io
+from .interpreter import code_hash, parse_function_cached
+from .node_types import NodeDefinition, SocketDef, ValueType
+from .policies import combine
+
+GROUP_HEADER = "# pypernode-group"
+
+
+def is_group_code(code: str) -> bool:
+    return code.lstrip().startswith(GROUP_HEADER)
+
+
+def load_group_doc(code: str) -> Dict[str, object]:
+    body = code.lstrip()[len(GROUP_HEADER):]
+    return json.loads(body)
+
+
+def dump_group(
+    name: str,
+    nodes: Iterable[Dict[str, object]],
+    connections: Iterable[Dict[str, object]],
+    inputs: List[Dict[str, object]],
+    outputs: List[Dict[str, object]],
+    mapping: Optional[Dict[str, object]] = None,
+) -> str:
+    codes: Dict[str, str] = {}
+    node_recs = []
+    for n in nodes:
+        h = code_hash(n['code'])
+        codes[h] = n['code']
+        node_recs.append({
+            "id": n['id'], "type": n['type'], "x": n['x'], "y": n['y'],
+            "params": graph_io.encode_params(n['params']), "code": h,
+        })
+    doc = {
+        "name": name,
+        "codes": codes,
+        "nodes": node_recs,
+        "connections": list(connections),
+        "inputs": inputs,
+        "outputs": outputs,
+    }
+    if mapping:
+        doc["map"] = mapping
+    return dump_group_doc(doc)
+
+
+def dump_group_doc(doc: Dict[str, object]) -> str:
+    """Group code for ``doc``; the inverse of load_group_doc."""
+    return GROUP_HEADER + "\n" + json.dumps(doc, sort_keys=True, indent=1, default=str)
+
+
+def set_mapping(code: str, input_name: Optional[str], processes: bool = False) -> str:
+    """Group code that maps over ``input_name`` (a plain group for None).
+    ``processes`` runs elements in worker processes instead of threads."""
+    doc = load_group_doc(code)
+    if input_name is None:
+        doc.pop("map", None)
+    else:
+        if input_name not in [spec['name'] for spec in doc['inputs']]:
+            raise ValueError(f"Group has no input {input_name!r}")
+        doc["map"] = {"input": input_name, "processes": processes}
+    return dump_group_doc(doc)
+
+
+def group_records(doc: Dict[str, object]) -> Iterable[Tuple[str, Dict[str, object]]]:
+    """Inner nodes and connections of a group as graph_io records."""
+    codes = doc['codes']
+    for n in doc['nodes']:
+        yield 'node', dict(n, code=codes[n['code']])
+    for c in doc['connections']:
+        yield 'connection', c
+
+
+def parse_group(code: str) -> NodeDefinition:
+    doc = load_group_doc(code)
+    codes = doc['codes']
+    inner = {n['id']: (n, parse_function_cached(codes[n['code']])) for n in doc['nodes']}
+
+    mapped = (doc.get('map') or {}).get('input')
+    inputs = []
+    for spec in doc['inputs']:
+        rec, definition = inner[spec['node']]
+        sock = definition.inputs[spec['socket']]
+        if spec['name'] == mapped:
+            inputs.append(SocketDef(spec['name'], ValueType.ANY, []))
+        else:
+            inputs.append(SocketDef(spec['name'], sock.type, rec['params'].get(sock.name, sock.default)))
+
+    outputs = []
+    for spec in doc['outputs']:
+        _, definition = inner[spec['node']]
+        out_type = ValueType.ANY if mapped else definition.outputs[spec['socket']].type
+        outputs.append(SocketDef(spec['name'], out_type))
+
+    policy = combine(definition.cache_policy for _, definition in inner.values())
+    return NodeDefinition(doc['name'], inputs, outputs, code, subgraph=doc, cache_policy=policy)
+
+
+class GroupRunner:
+    """Executes a group's subgraph. Inner results go to the cache of the
+    executor running the group, so a dirty group only re-runs the inner nodes
+    whose inputs changed, within the same memory budget as everything else."""
+
+    def __init__(self, definition: NodeDefinition):
+        from .engine import GraphExecutor
+        from .graph import Graph
+
+        self.definition = definition
+        doc = definition.subgraph
+        self.graph = Graph()
+        self.graph.populate(group_records(doc))
+        self.inputs = doc['inputs']
+        self.outputs = doc['outputs']
+        self.executor = GraphExecutor(self.graph.nodes, self.graph.connections)
+        # Map nodes run elements on several threads at once, and a group can
+        # be run by more than one run; each thread gets its own executor
+        self._local = threading.local()
+
+    def _thread_executor(self):
+        from .engine import GraphExecutor
+
+        executor = getattr(self._local, 'executor', None)
+        if executor is None:
+            nodes = {nid: node.snapshot() for nid, node in self.graph.nodes.items()}
+            executor = GraphExecutor(nodes, self.graph.connections)
+            executor._plan = self.executor.plan
+            self._local.executor = executor
+        return executor
+
+    def run(self, input_data: Dict[str, object], sandbox=None, progress=None, cache=None) -> Dict[str, object]:
+        overrides: Dict[str, Dict[str, object]] = {}
+        for spec in self.inputs:
+            node = self.graph.nodes[spec['node']]
+            overrides.setdefault(spec['node'], {})[node.inputs[spec['socket']]] = input_data[spec['name']]
+
+        executor = self._thread_executor()
+        executor.sandbox = sandbox
+        if cache is not None:
+            executor.cache = cache
+        results = executor.run(overrides)
+
+        outs = {}
+        for spec in self.outputs:
+            node = self.graph.nodes[spec['node']]
+            outs[spec['name']] = results[spec['node']][node.outputs[spec['socket']]]
+        return outs
+
+    def close(self) -> None:
+        """Release what inner map nodes hold on to (their worker processes)."""
+        for node in self.graph.nodes.values():
+            node.close()
+
+
+def make_runner(definition: NodeDefinition) -> GroupRunner:
+    if definition.subgraph.get('map'):
+        from .mapping import MapRunner
+
+        return MapRunner(definition)
+    return GroupRunner(definition)
+
+
+def _unique(name: str, taken: set) -> str:
+    candidate, k = name, 2
+    while candidate in taken:
+        candidate = f"{name}_{k}"
+        k += 1
+    taken.add(candidate)
+    return candidate
+
+
+def collapse(graph, node_ids: Iterable[str], name: str) -> Optional[str]:
+    """Replace ``node_ids`` in ``graph`` by a single group node; returns its id.
+
+    Inputs fed from outside the selection become group inputs, and outputs
+    consumed outside become group outputs. A group that feeds nothing exposes
+    the outputs of its inner sink nodes instead.
+    """
+
+    selected = [nid for nid in node_ids if nid in graph.nodes]
+    if not selected:
+        return None
+    inside = set(selected)
+    origin_x = min(graph.nodes[n].x for n in selected)
+    origin_y = min(graph.nodes[n].y for n in selected)
+
+    inner_conns, in_conns, out_conns = [], [], []
+    for c in graph.connections:
+        s_in, e_in = c['start_node'] in inside, c['end_node'] in inside
+        if s_in and e_in:
+            inner_conns.append(dict(c))
+        elif e_in:
+            in_conns.append(c)
+        elif s_in:
+            out_conns.append(c)
+
+    taken_in: set = set()
+    inputs, outer_inputs = [], []
+    for c in in_conns:
+        node = graph.nodes[c['end_node']]
+        sock_name = node.inputs[c['end_socket']]
+        label = sock_name if sock_name not in taken_in else f"{node.type}_{sock_name}"
+        inputs.append({"name": _unique(label, taken_in), "node": c['end_node'], "socket": c['end_socket']})
+        outer_inputs.append((c['start_node'], c['start_socket']))
+
+    exposed: Dict[Tuple[str, int], int] = {}
+    for c in out_conns:
+        exposed.setdefault((c['start_node'], c['start_socket']), len(exposed))
+    if not exposed:
+        feeding = {c['start_node'] for c in inner_conns}
+        for nid in selected:
+            if nid not in feeding:
+                for idx in range(len(graph.nodes[nid].outputs)):
+                    exposed.setdefault((nid, idx), len(exposed))
+
+    taken_out: set = set()
+    outputs = []
+    for (nid, idx), _ in sorted(exposed.items(), key=lambda kv: kv[1]):
+        node = graph.nodes[nid]
+        label = node.type if len(node.outputs) == 1 else f"{node.type}_{node.outputs[idx]}"
+        outputs.append({"name": _unique(label, taken_out), "node": nid, "socket": idx})
+
+    nodes = [
+        {
+            "id": n.id, "type": n.type, "x": n.x - origin_x, "y": n.y - origin_y,
+            "params": n.params, "code": n.code,
+        }
+        for n in (graph.nodes[nid] for nid in selected)
+    ]
+    code = dump_group(name, nodes, inner_conns, inputs, outputs)
+
+    outer_outputs = [(c, exposed[(c['start_node'], c['start_socket'])]) for c in out_conns]
+    for nid in selected:
+        graph.remove_node(nid)
+
+    group = graph.create_node(name, origin_x, origin_y, code=code)
+    for idx, (src, src_sock) in enumerate(outer_inputs):
+        graph.add_connection(src, src_sock, group.id, idx)
+    for c, idx in outer_outputs:
+        graph.add_connection(group.id, idx, c['end_node'], c['end_socket'])
+    return group.id
+
+
+def expand(graph, group_id: str, make_id: Callable[[str], str]) -> List[str]:
+    """Replace a group node in ``graph`` by its inner nodes; returns the new ids."""
+
+    group = graph.nodes[group_id]
+    doc = group.definition.subgraph
+    outer = graph.connections_of(group_id)
+    graph.remove_node(group_id)
+
+    ids = {}
+    for kind, rec in group_records(doc):
+        if kind == 'node':
+            ids[rec['id']] = make_id(rec['id'])
+            graph.create_node(
+                rec['type'], group.x + rec['x'], group.y + rec['y'], ids[rec['id']], rec['params'], rec['code']
+            )
+        else:
+            graph.add_connection(ids[rec['start_node']], rec['start_socket'], ids[rec['end_node']], rec['end_socket'])
+
+    for c in outer:
+        if c['end_node'] == group_id:
+            spec = doc['inputs'][c['end_socket']]
+            graph.add_connection(c['start_node'], c['start_socket'], ids[spec['node']], spec['socket'])
+        elif c['start_node'] == group_id:
+            spec = doc['outputs'][c['start_socket']]
+            graph.add_connection(ids[spec['node']], spec['socket'], c['end_node'], c['end_socket'])
+
+    # Values given to the group's unconnected inputs carry over to the inner sockets
+    connected = {c['end_socket'] for c in outer if c['end_node'] == group_id}
+    for idx, spec in enumerate(doc['inputs']):
+        if idx not in connected and spec['name'] in group.params:
+            inner = graph.nodes[ids[spec['node']]]
+            inner.params[inner.inputs[spec['socket']]] = group.params.get(spec['name'])
+
+    return list(ids.values())
+
+
+def flatten(graph) -> None:
+    """Expand every group node in ``graph``, recursively. Map nodes cannot be
+    expanded (their subgraph runs once per element) and raise ValueError."""
+    while True:
+        group_ids = [nid for nid, n in graph.nodes.items() if n.is_group]
+        if not group_ids:
+            return
+        for gid in group_ids:
+            if graph.nodes[gid].is_map:
+                raise ValueError(f"Map node {graph.nodes[gid].definition.name!r} cannot be flattened")
+        for gid in group_ids:
+            expand(graph, gid, lambda inner_id, gid=gid: f"{gid}/{inner_id}")
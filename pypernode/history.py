@@ -0,0 +1,292 @@
+"""Run history, kept in a SQLite database, and regression reports.
+
+Every completed run is recorded with its graph hash, wall time, peak memory,
+how many nodes it evaluated and how many of those came from the cache, and
+the runtime of each node it executed (with the size bucket of its inputs,
+see timings.size_bucket).
+
+A report compares the latest run of a graph with the runs before it. A node
+regressed when its latest runtime exceeds the median of its previous
+``window`` runtimes on inputs of the same size bucket by more than
+``threshold`` (0.5 is 50% slower). Node history is keyed by node id rather
+than by graph, so adding a node to a graph does not reset the baselines of
+the others; editing a node's code starts a new baseline for it. Members of a fused chain (see fusion) are only credited a share
+of the chain's time, so they are recorded but not compared.
+
+Peak memory is the resident set high-water mark of the process during the
+run on Linux, where it can be reset at the start of a run; elsewhere it is
+the peak since the process started. Either way it is measured for the whole
+process: when runs overlap (the editor running while another run is in
+progress), each start resets the mark for all of them, and each reports the
+peak of everything the process did since the latest reset.
+"""
+
+import hashlib
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .timings import format_duration, size_bucket
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    graph TEXT NOT NULL,
+    started REAL NOT NULL,
+    seconds REAL NOT NULL,
+    evaluated INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    peak_memory INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_graph ON runs (graph, id);
+CREATE TABLE IF NOT EXISTS node_runs (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    node TEXT NOT NULL,
+    type TEXT NOT NULL,
+    code_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    fused INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS node_runs_node ON node_runs (node, size, run);
+CREATE INDEX IF NOT EXISTS node_runs_run ON node_runs (run);
+"""
+
+
+def graph_hash(node_ids: Iterable[str]) -> str:
+    """Identity of a graph across runs and edits: a digest of its node ids."""
+    return hashlib.blake2b("\n".join(sorted(node_ids)).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def reset_peak_memory() -> bool:
+    """Restart the peak resident memory measurement, where supported (Linux).
+    This is process wide, so it also resets it for runs already in progress."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_memory() -> Optional[int]:
+    """Peak resident memory in bytes, or None if it cannot be measured."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def format_bytes(size: Optional[int]) -> str:
+    if size is None:
+        return "unknown"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class RunStats:
+    """What one run did, filled in by the executor (see GraphExecutor)."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.seconds: Optional[float] = None
+        self.peak_memory: Optional[int] = None
+        self.evaluated: set = set()
+        # node id -> (seconds, input size bucket, fused), for nodes that were executed
+        self.executed: Dict[str, Tuple[float, int, bool]] = {}
+        reset_peak_memory()
+        self._clock = time.perf_counter()
+
+    @property
+    def hits(self) -> int:
+        return len(self.evaluated) - len(self.executed)
+
+    def node_evaluated(self, nid: str) -> None:
+        self.evaluated.add(nid)
+
+    def node_executed(self, nid: str, inputs: Dict[str, object], seconds: float, fused: bool = False) -> None:
+        self.executed[nid] = (seconds, size_bucket(inputs), fused)
+
+    def finish(self) -> None:
+        self.seconds = time.perf_counter() - self._clock
+        self.peak_memory = peak_memory()
+
+
+class NodeTrend:
+    __slots__ = ("node", "type", "seconds", "baseline", "samples", "regressed")
+
+    def __init__(self, node: str, type: str, seconds: float, baseline: Optional[float], samples: int, regressed: bool):
+        self.node = node
+        self.type = type
+        self.seconds = seconds
+        self.baseline = baseline
+        self.samples = samples
+        self.regressed = regressed
+
+    @property
+    def change(self) -> Optional[float]:
+        """Relative change against the baseline (0.5 is 50% slower)."""
+        if not self.baseline:
+            return None
+        return self.seconds / self.baseline - 1
+
+    def badge(self) -> str:
+        change = self.change
+        return "" if change is None else f"{change:+.0%}"
+
+
+class Report:
+    """The latest run of a graph against the median of the runs before it."""
+
+    def __init__(self, run: sqlite3.Row, baseline: List[sqlite3.Row], nodes: List[NodeTrend], threshold: float):
+        self.run = run
+        self.baseline = baseline
+        self.nodes = nodes
+        self.threshold = threshold
+
+    @property
+    def regressions(self) -> List[NodeTrend]:
+        return [trend for trend in self.nodes if trend.regressed]
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        return self.run['hits'] / self.run['evaluated'] if self.run['evaluated'] else None
+
+    def lines(self, all_nodes: bool = False) -> List[str]:
+        run = self.run
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run['started']))
+        text = f"Run {run['id']} at {when}: {format_duration(run['seconds'])}"
+        if self.baseline:
+            median = statistics.median(r['seconds'] for r in self.baseline)
+            text += f" (median of previous {len(self.baseline)}: {format_duration(median)})"
+        lines = [text]
+        rate = self.hit_rate
+        rate_text = "n/a" if rate is None else f"{rate:.0%}"
+        previous = [r['hits'] / r['evaluated'] for r in self.baseline if r['evaluated']]
+        if previous:
+            rate_text += f" (median {statistics.median(previous):.0%})"
+        lines.append(f"  {run['evaluated']} nodes evaluated, cache hits {rate_text}")
+        lines.append(f"  peak memory {format_bytes(run['peak_memory'])}")
+
+        shown = self.nodes if all_nodes else self.regressions
+        if shown:
+            lines.append(
+                "Node runtimes:" if all_nodes else f"Regressions (more than {self.threshold:.0%} over the baseline):"
+            )
+        for trend in sorted(shown, key=lambda t: t.seconds, reverse=True):
+            baseline = "no baseline" if trend.baseline is None else (
+                f"baseline {format_duration(trend.baseline)} over {trend.samples} runs, {trend.badge()}"
+            )
+            flag = "  REGRESSED" if trend.regressed and all_nodes else ""
+            lines.append(f"  {trend.type} [{trend.node}]: {format_duration(trend.seconds)} ({baseline}){flag}")
+        if not all_nodes and not shown:
+            lines.append("No regressions.")
+        return lines
+
+
+class RunHistory:
+    """SQLite store of completed runs. Each call opens its own connection, so
+    one RunHistory can be used from any thread."""
+
+    def __init__(self, path: str, keep: int = 500):
+        self.path = path
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        if not self._ready:
+            conn.executescript(_SCHEMA)
+            self._ready = True
+        return conn
+
+    def add(self, graph: str, nodes: Dict[str, object], stats: RunStats) -> int:
+        """Record a completed run of ``nodes`` (NodeData by id); returns its id."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    cursor = conn.execute(
+                        "INSERT INTO runs (graph, started, seconds, evaluated, hits, peak_memory) VALUES (?, ?, ?, ?, ?, ?)",
+                        (graph, stats.started, stats.seconds or 0.0, len(stats.evaluated), stats.hits, stats.peak_memory),
+                    )
+                    run_id = cursor.lastrowid
+                    conn.executemany(
+                        "INSERT INTO node_runs (run, node, type, code_hash, size, seconds, fused)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (run_id, nid, nodes[nid].type, nodes[nid].code_hash, size, seconds, int(fused))
+                            for nid, (seconds, size, fused) in stats.executed.items()
+                            if nid in nodes
+                        ],
+                    )
+                    if self.keep:
+                        # Only the most recent runs of each graph are kept
+                        conn.execute(
+                            "DELETE FROM runs WHERE id IN (SELECT id FROM runs WHERE graph = ? ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                            (graph, self.keep),
+                        )
+                return run_id
+            finally:
+                conn.close()
+
+    def runs(self, graph: str, limit: int = 20) -> List[sqlite3.Row]:
+        """The latest runs of ``graph``, newest first."""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT * FROM runs WHERE graph = ? ORDER BY id DESC LIMIT ?", (graph, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def report(
+        self, graph: str, window: int = 10, threshold: float = 0.5, min_seconds: float = 0.01
+    ) -> Optional[Report]:
+        """Compare the latest run of ``graph`` with the runs before it; None if
+        it never ran. Changes below ``min_seconds`` are never regressions."""
+        conn = self._connect()
+        try:
+            runs = conn.execute(
+                "SELECT * FROM runs WHERE graph = ? ORDER BY id DESC LIMIT ?", (graph, window + 1)
+            ).fetchall()
+            if not runs:
+                return None
+            latest = runs[0]
+            trends = []
+            for row in conn.execute("SELECT * FROM node_runs WHERE run = ? AND NOT fused", (latest['id'],)):
+                previous = [
+                    r['seconds'] for r in conn.execute(
+                        "SELECT seconds FROM node_runs WHERE node = ? AND code_hash = ? AND size = ? AND run < ?"
+                        " AND NOT fused ORDER BY run DESC LIMIT ?",
+                        (row['node'], row['code_hash'], row['size'], latest['id'], window),
+                    )
+                ]
+                baseline = statistics.median(previous) if previous else None
+                regressed = baseline is not None and (
+                    row['seconds'] > baseline * (1 + threshold) and row['seconds'] - baseline >= min_seconds
+                )
+                trends.append(NodeTrend(row['node'], row['type'], row['seconds'], baseline, len(previous), regressed))
+            return Report(latest, runs[1:], trends, threshold)
+        finally:
+            conn.close()
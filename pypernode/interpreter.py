@@ -1,17 +1,34 @@
 from __future__ import annotations
 
 import ast
+import hashlib
 import textwrap
-from typing import Optional
+import threading
+from typing import Callable, Dict, Optional
 
 from .node_types import NodeDefinition, SocketDef, ValueType
+from .policies import cache_policy, policy_from_source
+
+_PARSE_CACHE_LIMIT = 1024
+_parse_cache: Dict[str, NodeDefinition] = {}
+_parse_lock = threading.Lock()
+_function_cache: Dict[str, Callable] = {}
+
+
+_ARRAY_NAMES = {"ndarray", "array", "arraylike", "tensor"}
+_TABLE_NAMES = {"dataframe", "table"}
 
 
 def _annotation_to_type(annotation: Optional[ast.expr]) -> ValueType:
+    if isinstance(annotation, ast.Subscript):
+        # np.ndarray[...], npt.NDArray[np.float64]
+        annotation = annotation.value
     if isinstance(annotation, ast.Name):
         name = annotation.id.lower()
     elif isinstance(annotation, ast.Attribute):
         name = annotation.attr.lower()
+    elif isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+        name = annotation.value.rsplit(".", 1)[-1].split("[", 1)[0].lower()
     else:
         return ValueType.ANY
 
@@ -23,6 +40,10 @@ def _annotation_to_type(annotation: Optional[ast.expr]) -> ValueType:
         return ValueType.BOOLEAN
     if name in {"date", "datetime"}:
         return ValueType.DATE
+    if name in _ARRAY_NAMES:
+        return ValueType.ARRAY
+    if name in _TABLE_NAMES:
+        return ValueType.TABLE
     return ValueType.ANY
 
 
@@ -63,4 +84,59 @@ def parse_function(code: str) -> NodeDefinition:
     return_type = _annotation_to_type(func_def.returns)
     outputs = [SocketDef("result", return_type)]
 
-    return NodeDefinition(func_def.name, inputs, outputs, cleaned_code)
+    policy = policy_from_source(func_def, cleaned_code)
+    return NodeDefinition(func_def.name, inputs, outputs, cleaned_code, cache_policy=policy)
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha1(code.encode('utf-8')).hexdigest()
+
+
+def parse_node_code(code: str) -> NodeDefinition:
+    """Parse node source: either a plain function or a serialized group."""
+
+    from .groups import is_group_code, parse_group
+
+    if is_group_code(code):
+        return parse_group(code)
+    return parse_function(code)
+
+
+def parse_function_cached(code: str) -> NodeDefinition:
+    """Like parse_node_code, but memoized by the hash of the source text.
+
+    Safe to call from worker threads; the returned definition is shared and
+    must be treated as read-only.
+    """
+
+    key = code_hash(code)
+    definition = _parse_cache.get(key)
+    if definition is None:
+        definition = parse_node_code(code)
+        with _parse_lock:
+            if len(_parse_cache) >= _PARSE_CACHE_LIMIT:
+                _parse_cache.pop(next(iter(_parse_cache)))
+            _parse_cache[key] = definition
+    return definition
+
+
+def compile_function(code: str, name: str) -> Callable:
+    """Execute node source once and return the function called ``name``.
+
+    Memoized by source hash, so a node only pays for ``exec`` the first time
+    its code is seen.
+    """
+
+    key = code_hash(code)
+    func = _function_cache.get(key)
+    if func is None:
+        scope: Dict[str, object] = {"cache_policy": cache_policy}
+        exec(code, scope, scope)
+        func = scope.get(name)
+        if not callable(func):
+            raise ValueError(f"Function {name} not found in code")
+        with _parse_lock:
+            if len(_function_cache) >= _PARSE_CACHE_LIMIT:
+                _function_cache.pop(next(iter(_function_cache)))
+            _function_cache[key] = func
+    return func
@@ -0,0 +1,154 @@
+"""Checkpoint journal for long runs.
+
+While a run is journaled, every result the executor stores is also written
+to disk: the outputs as a pickle named by the node's cache key, then one line
+with that key appended to the journal file. A later run of the same graph,
+after a crash or restart, replays the journal and takes completed nodes'
+results from it, so execution effectively continues from the first
+unfinished node. The journal is removed once a run completes.
+
+Results are pickled: outputs that cannot be pickled are not journaled, and
+those nodes run again on resume.
+
+Only one run at a time can use a graph's journal: a RunJournal holds an
+exclusive lock on it (released by the OS if the process dies) until it is
+closed, and opening a journal that is in use raises JournalLocked.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from .history import graph_hash
+from .paths import runs_dir
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class JournalLocked(RuntimeError):
+    """The journal is in use by another run of the same graph."""
+
+
+def journal_dir(node_ids: Iterable[str]) -> str:
+    """Journal directory of a graph, identified by its node ids."""
+    return os.path.join(runs_dir(), graph_hash(node_ids))
+
+
+def _lock_file(path: str):
+    """Open and exclusively lock ``path``; None if another process holds it."""
+    f = open(path, 'a+b')
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+class RunJournal:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, "journal")
+        self._index: Dict[str, float] = {}
+        self._file = None
+        self._lock = threading.Lock()
+        # Next to the directory, which clear() removes while the lock is held
+        os.makedirs(os.path.dirname(directory) or ".", exist_ok=True)
+        self._lock_file = _lock_file(directory + ".lock")
+        if self._lock_file is None:
+            raise JournalLocked("Another run of this graph is using its checkpoint journal")
+        self.replay()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def _result_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pkl")
+
+    def replay(self) -> None:
+        """Load the index of completed results; a record cut short by a crash
+        ends the journal."""
+        self._index.clear()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if os.path.exists(self._result_path(record['key'])):
+                        self._index[record['key']] = record['time']
+        except OSError:
+            pass
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Dict[str, object]]:
+        stored = self._index.get(key)
+        if stored is None or (max_age is not None and time.time() - stored > max_age):
+            return None
+        try:
+            with open(self._result_path(key), 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            self._index.pop(key, None)
+            return None
+
+    def record(self, key: str, outputs: Dict[str, object]) -> None:
+        if key in self._index:
+            return
+        try:
+            payload = pickle.dumps(outputs, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # The result file is complete before the journal points at it
+            target = self._result_path(key)
+            with open(target + ".tmp", 'wb') as f:
+                f.write(payload)
+            os.replace(target + ".tmp", target)
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            now = time.time()
+            self._file.write(json.dumps({'key': key, 'time': now}) + "\n")
+            self._file.flush()
+            self._index[key] = now
+
+    def close(self) -> None:
+        """Stop journaling and let other runs use the journal."""
+        self._close_file()
+        self._unlock()
+
+    def clear(self) -> None:
+        """Discard the journal, after a run completed."""
+        self._close_file()
+        self._index.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self._unlock()
+
+    def _close_file(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _unlock(self) -> None:
+        with self._lock:
+            if self._lock_file is not None:
+                # Closing the file releases the lock
+                self._lock_file.close()
+                self._lock_file = None
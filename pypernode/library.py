@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import os
+import re
+import textwrap
 from typing import Dict, List, Optional
 
-from .interpreter import parse_function
+from .groups import dump_group_doc, is_group_code, load_group_doc
+from .interpreter import parse_function_cached
 from .node_types import NodeDefinition
+from .paths import cache_dir, user_nodes_dir
+from .plugins import scan_plugin_dirs
 
 
 DEFAULT_NODE_CODES = [
@@ -66,24 +72,108 @@ def date_to_string(value: date) -> str:
 ]
 
 
+_DEF_NAME = re.compile(r"^def\s+([A-Za-z_]\w*)\s*\(", re.MULTILINE)
+
+
+def _source_name(code: str) -> Optional[str]:
+    """Cheaply find the node name of a source without parsing it."""
+    if is_group_code(code):
+        return None
+    match = _DEF_NAME.search(textwrap.dedent(code))
+    return match.group(1) if match else None
+
+
+def rename_node_code(code: str, old_name: str, new_name: str) -> str:
+    """Return ``code`` with its node (function or group) renamed."""
+    if is_group_code(code):
+        doc = load_group_doc(code)
+        doc['name'] = new_name
+        return dump_group_doc(doc)
+    return re.sub(rf"^(\s*def\s+){re.escape(old_name)}(\s*\()", rf"\g<1>{new_name}\g<2>", code, count=1, flags=re.MULTILINE)
+
+
 class NodeLibrary:
+    # Source of every registered node type, in registration order. Sources
+    # are parsed into _definitions on first lookup.
+    _sources: Dict[str, str] = {}
     _definitions: Dict[str, NodeDefinition] = {}
 
+    # Extra directories of node files; see plugins.py. The user's own
+    # directory and $PYPERNODE_PLUGIN_PATH are always scanned.
+    plugin_dirs: List[str] = []
+    _plugins_loaded = False
+
     @classmethod
     def register_from_code(cls, code: str) -> NodeDefinition:
-        definition = parse_function(code)
+        definition = parse_function_cached(code)
+        cls._sources[definition.name] = code
         cls._definitions[definition.name] = definition
         return definition
 
+    @classmethod
+    def register_source(cls, code: str) -> str:
+        """Register code without parsing it yet; returns the node name."""
+        name = _source_name(code)
+        if name is None:
+            return cls.register_from_code(code).name
+        cls._definitions.pop(name, None)
+        cls._sources[name] = code
+        return name
+
+    @classmethod
+    def add_plugin_dir(cls, path: str) -> None:
+        if path not in cls.plugin_dirs:
+            cls.plugin_dirs.append(path)
+            cls._plugins_loaded = False
+
+    @classmethod
+    def get_plugin_dirs(cls) -> List[str]:
+        env_dirs = [d for d in os.environ.get("PYPERNODE_PLUGIN_PATH", "").split(os.pathsep) if d]
+        return list(dict.fromkeys([user_nodes_dir(), *env_dirs, *cls.plugin_dirs]))
+
+    @classmethod
+    def load_plugins(cls) -> int:
+        cls._plugins_loaded = True
+        loaded = scan_plugin_dirs(cls.get_plugin_dirs(), os.path.join(cache_dir(), "plugins.pickle"))
+        for code, definition in loaded:
+            cls._sources[definition.name] = code
+            cls._definitions[definition.name] = definition
+        return len(loaded)
+
+    @classmethod
+    def _ensure_plugins(cls) -> None:
+        if not cls._plugins_loaded:
+            cls.load_plugins()
+
+    @classmethod
+    def save_node_type(cls, code: str, directory: Optional[str] = None) -> NodeDefinition:
+        """Register ``code`` and persist it as a node file in a plugin directory."""
+        definition = cls.register_from_code(code)
+        directory = directory or user_nodes_dir()
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{definition.name}.py"), 'w', encoding='utf-8') as f:
+            f.write(code)
+        return definition
+
     @classmethod
     def get_definition(cls, type_name: str) -> Optional[NodeDefinition]:
-        return cls._definitions.get(type_name)
+        cls._ensure_plugins()
+        definition = cls._definitions.get(type_name)
+        if definition is None and type_name in cls._sources:
+            definition = parse_function_cached(cls._sources[type_name])
+            cls._definitions[type_name] = definition
+        return definition
+
+    @classmethod
+    def get_names(cls) -> List[str]:
+        cls._ensure_plugins()
+        return list(cls._sources)
 
     @classmethod
     def get_all_definitions(cls) -> List[NodeDefinition]:
-        return list(cls._definitions.values())
+        return [d for d in (cls.get_definition(n) for n in cls.get_names()) if d is not None]
 
     @classmethod
     def register_default_nodes(cls) -> None:
         for code in DEFAULT_NODE_CODES:
-            cls.register_from_code(code)
+            cls.register_source(code)
@@ -0,0 +1,152 @@
+"""Map nodes: a group applied to every element of a collection.
+
+The mapped input receives a collection; the other inputs are passed unchanged
+to every element's run. Elements are split into chunks that run on a thread
+pool, or on a process pool for pure-Python work that would hold the GIL.
+The process pool is created once per map node and receives the group's code
+once; it lives until the node is closed (see NodeData.close). Results stream back as chunks finish, and ``progress(done, total)``
+reports them.
+
+Each element's outputs are cached, in the cache of the executor running the
+map node, under a key made of the group's code hash, the other inputs and
+the element itself, so running again after items were appended only
+computes the new ones.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .cache import ResultCache, budget_from_env
+from .groups import GroupRunner
+from .interpreter import code_hash
+from .node_types import NodeDefinition
+from .values import hash_value
+
+Chunk = List[Tuple[int, Dict[str, object]]]
+
+# Per process: the group every element runs through
+_process_runner: Optional[GroupRunner] = None
+
+
+def _init_process(code: str) -> None:
+    global _process_runner
+    from .groups import parse_group
+
+    _process_runner = GroupRunner(parse_group(code))
+
+
+def _run_element(runner: GroupRunner, idx: int, inputs: Dict[str, object], sandbox=None, cache=None) -> Dict[str, object]:
+    try:
+        return GroupRunner.run(runner, inputs, sandbox, cache=cache)
+    except Exception as e:
+        raise RuntimeError(f"Element {idx}: {e}") from e
+
+
+def _run_chunk_in_process(chunk: Chunk) -> List[Tuple[int, Dict[str, object]]]:
+    return [(idx, _run_element(_process_runner, idx, inputs)) for idx, inputs in chunk]
+
+
+class MapRunner(GroupRunner):
+    def __init__(self, definition: NodeDefinition, workers: Optional[int] = None):
+        super().__init__(definition)
+        mapping = definition.subgraph['map']
+        self.map_input: str = mapping['input']
+        self.processes: bool = bool(mapping.get('processes'))
+        cpus = os.cpu_count() or 1
+        # Threads also overlap waiting (I/O, released GIL), so there are more of them
+        self.workers = workers or (cpus if self.processes else min(32, cpus + 4))
+        # Used when no cache is passed in, such as inside a process pool worker
+        self.results = ResultCache(max_bytes=budget_from_env())
+        self._prefix = code_hash(definition.code)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+                initargs=(self.definition.code,),
+            )
+        return self._pool
+
+    def close(self) -> None:
+        """Stop the worker processes once the chunks already submitted are done."""
+        super().close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _run_chunk(self, chunk: Chunk, sandbox, cache) -> List[Tuple[int, Dict[str, object]]]:
+        return [(idx, _run_element(self, idx, inputs, sandbox, cache)) for idx, inputs in chunk]
+
+    def run(
+        self,
+        input_data: Dict[str, object],
+        sandbox=None,
+        progress: Optional[Callable[[int, int], None]] = None,
+        cache: Optional[ResultCache] = None,
+    ) -> Dict[str, object]:
+        cache = cache if cache is not None else self.results
+        items = input_data.get(self.map_input)
+        if items is None:
+            items = []
+        elif isinstance(items, dict):
+            items = list(items.values())
+        else:
+            items = list(items)
+        shared = {name: value for name, value in input_data.items() if name != self.map_input}
+        prefix = f"{self._prefix}:{hash_value(shared)}:"
+        keys = [prefix + hash_value(item) for item in items]
+
+        total = len(items)
+        outs: List[Optional[Dict[str, object]]] = [cache.get(key) for key in keys]
+        pending = [idx for idx, found in enumerate(outs) if found is None]
+        done = total - len(pending)
+        if progress:
+            progress(done, total)
+
+        if pending:
+            size = max(1, len(pending) // (self.workers * 4))
+            chunks: List[Chunk] = [
+                [(idx, dict(shared, **{self.map_input: items[idx]})) for idx in pending[i:i + size]]
+                for i in range(0, len(pending), size)
+            ]
+            if self.processes:
+                futures = [self._process_pool().submit(_run_chunk_in_process, chunk) for chunk in chunks]
+                self._collect(futures, outs, keys, done, total, progress, cache)
+            else:
+                with ThreadPoolExecutor(min(self.workers, len(chunks))) as pool:
+                    futures = [pool.submit(self._run_chunk, chunk, sandbox, cache) for chunk in chunks]
+                    self._collect(futures, outs, keys, done, total, progress, cache)
+
+        return {spec['name']: [element[spec['name']] for element in outs] for spec in self.outputs}
+
+    def _collect(
+        self,
+        futures: List[Future],
+        outs: List[Optional[Dict[str, object]]],
+        keys: List[str],
+        done: int,
+        total: int,
+        progress: Optional[Callable[[int, int], None]],
+        cache: ResultCache,
+    ) -> None:
+        remaining = set(futures)
+        while remaining:
+            finished, remaining = wait(remaining, return_when=FIRST_COMPLETED)
+            for future in finished:
+                try:
+                    chunk = future.result()
+                except Exception:
+                    for other in remaining:
+                        other.cancel()
+                    raise
+                for idx, element in chunk:
+                    outs[idx] = element
+                    cache.put(keys[idx], element)
+                done += len(chunk)
+            if progress:
+                progress(done, total)
@@ -1,15 +1,16 @@
 import hashlib
-import json
-import time
+import uuid
 from typing import Dict, Optional
 
-from .interpreter import parse_function
+from .interpreter import code_hash, compile_function, parse_function_cached
 from .node_types import NodeDefinition
+from .previews import Preview, make_previews
+from .values import share
 
 
 class NodeData:
     def __init__(self, definition: NodeDefinition, x: float = 0, y: float = 0, id: Optional[str] = None):
-        self.id = id if id else str(int(time.time() * 1000)) + str(id)
+        self.id = id if id else uuid.uuid4().hex
         self.x = x
         self.y = y
 
@@ -22,38 +23,169 @@ class NodeData:
         self.code = definition.code
         self.params = {sock.name: sock.default for sock in self.input_defs}
 
-        # Runtime State
-        self.last_output: Dict[str, object] = {}
+        # Runtime State; outputs normally live in a ResultCache (see bind_output)
         self.last_error: Optional[str] = None
         self.cache_hash: Optional[str] = None
+        self.last_preview: Dict[str, Preview] = {}
+        self._output: Optional[Dict[str, object]] = None
+        self._output_ref = None
+        self._output_version = 0
+        self._preview_version = 0
 
-    def refresh_definition_from_code(self) -> None:
+        self._code_key = None
+        self._group_runner = None
+
+    @property
+    def code_hash(self) -> str:
+        if self._code_key is None or self._code_key[0] is not self.code:
+            self._code_key = (self.code, code_hash(self.code))
+        return self._code_key[1]
+
+    @property
+    def last_output(self) -> Dict[str, object]:
+        """Outputs of the last run; empty if there are none or they were evicted."""
+        if self._output_ref is not None:
+            cache, key = self._output_ref
+            return cache.peek(key) or {}
+        return self._output or {}
+
+    @last_output.setter
+    def last_output(self, outputs: Dict[str, object]) -> None:
+        self._output, self._output_ref = outputs, None
+        self._output_version += 1
+
+    def bind_output(self, cache, key: str) -> None:
+        """Refer to outputs held by ``cache`` under ``key`` instead of keeping them."""
+        self._output, self._output_ref = None, (cache, key)
+        self._output_version += 1
+
+    @property
+    def has_output(self) -> bool:
+        """Whether the node has run, even if its outputs were evicted since."""
+        return self._output_ref is not None or bool(self._output)
+
+    @property
+    def evicted(self) -> bool:
+        return self._output_ref is not None and self._output_ref[1] not in self._output_ref[0]
+
+    def previews(self) -> Dict[str, Preview]:
+        """Previews of last_output, built on first use after it changes. They
+        outlive eviction of the outputs themselves."""
+        if self._preview_version != self._output_version:
+            outs = self.last_output
+            if outs or not self.evicted:
+                self.last_preview = make_previews(outs)
+            self._preview_version = self._output_version
+        return self.last_preview
+
+    def snapshot(self) -> "NodeData":
+        """Copy to run on while this node stays editable. Definitions and code
+        are immutable and shared, params are copied, and groups share their
+        runner (and so its caches) with the copy."""
+        if self.is_group:
+            self.group_runner()
+        copy = NodeData.__new__(NodeData)
+        copy.__dict__.update(self.__dict__)
+        copy.params = dict(self.params)
+        return copy
+
+    def commit(self, snapshot: "NodeData") -> bool:
+        """Adopt the outcome of a run on ``snapshot``; False if this node was
+        edited since the snapshot was taken, in which case the result is stale
+        and dropped."""
+        if (
+            snapshot.definition is not self.definition
+            or snapshot.code != self.code
+            or len(snapshot.params) != len(self.params)
+            or any(self.params.get(name, self) is not value for name, value in snapshot.params.items())
+        ):
+            return False
+        self._output, self._output_ref = snapshot._output, snapshot._output_ref
+        self._output_version += 1
+        if snapshot._preview_version == snapshot._output_version:
+            self.last_preview = snapshot.last_preview
+            self._preview_version = self._output_version
+        self.last_error = snapshot.last_error
+        self.cache_hash = snapshot.cache_hash
+        return True
+
+    @property
+    def is_group(self) -> bool:
+        return self.definition.subgraph is not None
+
+    def refresh_definition_from_code(self) -> bool:
         try:
-            new_def = parse_function(self.code)
-            self.definition = new_def
-            self.type = new_def.name
-            self.input_defs = new_def.inputs
-            self.output_defs = new_def.outputs
-            self.inputs = [i.name for i in self.input_defs]
-            self.outputs = [o.name for o in self.output_defs]
-            for sock in self.input_defs:
-                self.params.setdefault(sock.name, sock.default)
+            new_def = parse_function_cached(self.code)
         except Exception:
             # Keep previous definition if parsing fails
-            pass
+            return False
+        return self.apply_definition(new_def)
 
-    def compute_hash(self, input_values: Dict[str, object]) -> str:
+    def apply_definition(self, new_def: NodeDefinition) -> bool:
+        """Adopt a freshly parsed definition; returns True if the sockets changed."""
+        changed = new_def.signature() != self.definition.signature()
+        old_types = {sock.name: sock.type for sock in self.input_defs}
+        for sock in new_def.inputs:
+            if sock.name in old_types and old_types[sock.name] != sock.type:
+                # A retyped input would keep a value of the wrong kind
+                self.params[sock.name] = sock.default
+        self.definition = new_def
+        self.type = new_def.name
+        self.input_defs = new_def.inputs
+        self.output_defs = new_def.outputs
+        self.inputs = [i.name for i in self.input_defs]
+        self.outputs = [o.name for o in self.output_defs]
+        for sock in self.input_defs:
+            self.params.setdefault(sock.name, sock.default)
+        return changed
+
+    def compute_hash(self, input_keys: Dict[str, str]) -> str:
+        """Cache key from the code and a digest per input.
+
+        ``input_keys`` holds, per input socket, either the upstream node's
+        key and pin (for connected inputs) or a hash of the value.
+        """
         hasher = hashlib.sha256()
-        hasher.update(json.dumps(self.params, sort_keys=True, default=str).encode('utf-8'))
-        hasher.update(self.code.encode('utf-8'))
-        hasher.update(str(input_values).encode('utf-8'))
+        hasher.update(self.code_hash.encode('utf-8'))
+        for name in self.inputs:
+            hasher.update(f"{name}={input_keys.get(name)};".encode('utf-8'))
         return hasher.hexdigest()
 
-    def execute(self, input_data: Dict[str, object]):
-        local_scope: Dict[str, object] = {}
-        exec(self.code, local_scope, local_scope)
-        func = local_scope.get(self.definition.name)
-        if not callable(func):
-            raise ValueError(f"Function {self.definition.name} not found in code")
-        result = func(**input_data)
-        return {self.output_defs[0].name: result}
+    def execute(self, input_data: Dict[str, object], sandbox=None, progress=None, cache=None):
+        """Run the node; with a SandboxPool, in one of its worker processes.
+        Map nodes report ``progress(done, total)`` over their elements. Groups
+        keep inner results in ``cache`` (the caller's ResultCache)."""
+        if self.is_group:
+            return self.group_runner().run(input_data, sandbox, progress, cache)
+
+        if sandbox is not None:
+            result = sandbox.call(self.code, self.definition.name, input_data)
+        else:
+            result = self.function()(**input_data)
+        return {self.output_defs[0].name: share(result)}
+
+    def function(self):
+        return compile_function(self.code, self.definition.name)
+
+    @property
+    def is_map(self) -> bool:
+        return self.is_group and bool(self.definition.subgraph.get('map'))
+
+    def group_runner(self):
+        from .groups import make_runner
+
+        if self._group_runner is None or self._group_runner.definition is not self.definition:
+            self.close()
+            self._group_runner = make_runner(self.definition)
+        return self._group_runner
+
+    def close(self) -> None:
+        """Release what running the node holds on to: the worker processes of
+        a map node. Snapshots share them, so only the live node is closed."""
+        if self._group_runner is not None:
+            self._group_runner.close()
+
+
+def snapshot(nodes: Dict[str, NodeData]) -> Dict[str, NodeData]:
+    """Snapshots of a graph's nodes by id (see NodeData.snapshot)."""
+    return {nid: node.snapshot() for nid, node in nodes.items()}
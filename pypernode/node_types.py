@@ -3,16 +3,24 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import date
 from enum import Enum
-from typing import Any
+from typing import Any, Dict, Optional
+
+from .policies import DEFAULT_POLICY, CachePolicy
 
 
 class ValueType(str, Enum):
-    """Supported primitive value types for node inputs and outputs."""
+    """Supported value types for node inputs and outputs.
+
+    ARRAY covers n-dimensional arrays (e.g. NumPy) and TABLE covers tabular
+    data (e.g. pandas DataFrames); both default to None.
+    """
 
     NUMBER = "number"
     STRING = "string"
     BOOLEAN = "boolean"
     DATE = "date"
+    ARRAY = "array"
+    TABLE = "table"
     ANY = "any"
 
     def default_value(self) -> Any:
@@ -35,6 +43,10 @@ class ValueType(str, Enum):
             return "#4CAF50"
         if self == ValueType.DATE:
             return "#3F51B5"
+        if self == ValueType.ARRAY:
+            return "#E91E63"
+        if self == ValueType.TABLE:
+            return "#9C27B0"
         return "#888888"
 
     def is_compatible_with(self, other: "ValueType") -> bool:
@@ -56,3 +68,14 @@ class NodeDefinition:
     inputs: list[SocketDef]
     outputs: list[SocketDef]
     code: str
+    # Set for group nodes: the decoded subgraph document (see groups.py)
+    subgraph: Optional[Dict[str, Any]] = None
+    cache_policy: CachePolicy = DEFAULT_POLICY
+
+    def signature(self) -> tuple:
+        """Everything about the definition that affects sockets, but not the body."""
+        return (
+            self.name,
+            tuple((s.name, s.type, repr(s.default)) for s in self.inputs),
+            tuple((s.name, s.type) for s in self.outputs),
+        )
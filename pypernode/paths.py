@@ -0,0 +1,26 @@
+import os
+
+
+def app_dir() -> str:
+    """Per-user PyPerNode directory (``$PYPERNODE_HOME`` or ``~/.pypernode``)."""
+    return os.environ.get("PYPERNODE_HOME") or os.path.join(os.path.expanduser("~"), ".pypernode")
+
+
+def user_nodes_dir() -> str:
+    return os.path.join(app_dir(), "nodes")
+
+
+def cache_dir() -> str:
+    return os.path.join(app_dir(), "cache")
+
+
+def timings_path() -> str:
+    return os.path.join(app_dir(), "timings.json")
+
+
+def runs_dir() -> str:
+    return os.path.join(app_dir(), "runs")
+
+
+def history_path() -> str:
+    return os.path.join(app_dir(), "history.sqlite")
@@ -0,0 +1,102 @@
+"""Node types loaded from plugin directories.
+
+Every ``.py`` file in a plugin directory holds one node (a function or a
+saved group). Parsed definitions are kept in a cache file keyed by path and
+validated by mtime and size, falling back to the content hash, so only new
+or edited files are read and parsed again.
+"""
+
+import os
+import pickle
+from typing import Dict, List, Optional, Tuple
+
+from .interpreter import code_hash, parse_function_cached
+from .node_types import NodeDefinition
+
+CACHE_VERSION = 3
+
+
+class PluginCache:
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    data = pickle.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    self.entries = data['entries']
+            except Exception:
+                # A corrupt cache only costs a re-parse
+                self.entries = {}
+
+    def save(self) -> None:
+        if not self.path or not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump({'version': CACHE_VERSION, 'entries': self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def _load_file(path: str, st: os.stat_result, cache: PluginCache) -> Optional[Tuple[str, NodeDefinition]]:
+    entry = cache.entries.get(path)
+    if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+        return (entry['code'], entry['definition']) if entry['definition'] else None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        code = f.read()
+    h = code_hash(code)
+    if entry and entry['hash'] == h:
+        definition = entry['definition']
+    else:
+        try:
+            definition = parse_function_cached(code)
+        except Exception:
+            # Remember broken files too, so they are not re-parsed on every scan
+            definition = None
+
+    cache.entries[path] = {
+        'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'hash': h, 'code': code, 'definition': definition,
+    }
+    cache.dirty = True
+    return (code, definition) if definition else None
+
+
+def scan_plugin_dirs(dirs: List[str], cache_path: Optional[str] = None) -> List[Tuple[str, NodeDefinition]]:
+    """Return (code, definition) for every node file in ``dirs``."""
+
+    cache = PluginCache(cache_path)
+    found = []
+    seen = set()
+    for directory in dirs:
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        for name in names:
+            if not name.endswith('.py'):
+                continue
+            path = os.path.abspath(os.path.join(directory, name))
+            try:
+                st = os.stat(path)
+                loaded = _load_file(path, st, cache)
+            except OSError:
+                continue
+            seen.add(path)
+            if loaded:
+                found.append(loaded)
+
+    scanned = {os.path.abspath(d) for d in dirs}
+    for path in [p for p in cache.entries if p not in seen and os.path.dirname(p) in scanned]:
+        del cache.entries[path]
+        cache.dirty = True
+
+    try:
+        cache.save()
+    except OSError:
+        pass
+    return found
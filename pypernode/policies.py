@@ -0,0 +1,164 @@
+"""Per-node cache policies.
+
+A node declares how its results may be cached with a decorator::
+
+    @cache_policy("ttl", seconds=60, max_size="50MB")
+    def fetch_prices(url: str) -> DataFrame: ...
+
+or with a comment anywhere in its code::
+
+    # cache: never
+
+A ``# cache:`` comment is only read as a policy when it consists of modes
+and options; other comments that happen to start that way (``# cache:
+results keyed by url``) are ignored.
+
+Modes:
+
+* ``always`` (default): the node is pure. Its results are cached by structural
+  key and shared with identical nodes.
+* ``never``: the node runs on every execution (clocks, random numbers,
+  external state).
+* ``ttl``: a cached result is reused for ``seconds`` after it was computed.
+* ``watch``: string inputs that name existing files are part of the cache key
+  through their modification time and size, so editing the file invalidates
+  the result.
+
+``max_size`` (bytes, or a string such as ``"10MB"``) applies to every mode:
+outputs larger than that are passed on but not kept in the cache.
+"""
+
+import ast
+import re
+from dataclasses import dataclass
+from typing import Iterable, Optional, Union
+
+MODES = ("always", "never", "ttl", "watch")
+# Names accepted as name=value in a comment
+_OPTIONS = ("ttl", "seconds", "max_size", "max")
+
+_COMMENT = re.compile(r"^\s*#\s*cache\s*:\s*(.+?)\s*$", re.MULTILINE)
+_SIZE = re.compile(r"^\s*([\d.]+)\s*([kmgt]?i?b?)?\s*$", re.IGNORECASE)
+_UNITS = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    mode: str = "always"
+    seconds: Optional[float] = None
+    max_bytes: Optional[int] = None
+
+    @property
+    def volatile(self) -> bool:
+        """Whether outputs may differ between runs with identical inputs."""
+        return self.mode in ("never", "ttl")
+
+    @property
+    def shareable(self) -> bool:
+        """Whether identical nodes within a run may share one execution."""
+        return self.mode != "never"
+
+
+DEFAULT_POLICY = CachePolicy()
+
+
+def parse_size(value: Union[int, float, str, None]) -> Optional[int]:
+    if value is None or isinstance(value, (int, float)):
+        return None if value is None else int(value)
+    match = _SIZE.match(value)
+    if not match:
+        raise ValueError(f"Invalid size: {value!r}")
+    unit = (match.group(2) or "").lower()[:1]
+    return int(float(match.group(1)) * _UNITS.get(unit if unit != "b" else "", 1))
+
+
+def parse_duration(value: Union[int, float, str]) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = value.strip().lower()
+    if text and text[-1] in _DURATION_UNITS:
+        return float(text[:-1]) * _DURATION_UNITS[text[-1]]
+    return float(text)
+
+
+def make_policy(mode: str = "always", seconds=None, max_size=None) -> CachePolicy:
+    mode = mode.lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown cache mode {mode!r}; expected one of {', '.join(MODES)}")
+    if mode == "ttl" and seconds is None:
+        raise ValueError("The ttl cache mode needs seconds")
+    return CachePolicy(mode, parse_duration(seconds) if seconds is not None else None, parse_size(max_size))
+
+
+def cache_policy(mode: str = "always", seconds=None, max_size=None):
+    """Decorator form of the policy. It only marks the function; the policy is
+    read from the source when the node is parsed."""
+    policy = make_policy(mode, seconds, max_size)
+
+    def mark(func):
+        func.cache_policy = policy
+        return func
+
+    return mark
+
+
+def _from_decorator(call: ast.Call) -> CachePolicy:
+    args = [ast.literal_eval(a) for a in call.args]
+    kwargs = {kw.arg: ast.literal_eval(kw.value) for kw in call.keywords}
+    return make_policy(*args, **kwargs)
+
+
+def _from_comment(text: str) -> Optional[CachePolicy]:
+    """Policy of a ``# cache:`` comment, or None if it is not one."""
+    tokens = text.replace(",", " ").split()
+    for token in tokens:
+        name, sep, _ = token.partition("=")
+        if name.lower() not in (_OPTIONS if sep else MODES):
+            return None
+    mode, kwargs = "always", {}
+    for token in tokens:
+        name, sep, value = token.partition("=")
+        name = name.lower()
+        if not sep:
+            mode = name
+        elif name in ("ttl", "seconds"):
+            mode, kwargs["seconds"] = ("ttl" if mode == "always" else mode), value
+        else:
+            kwargs["max_size"] = value
+    return make_policy(mode, **kwargs)
+
+
+def policy_from_source(func_def: ast.FunctionDef, code: str) -> CachePolicy:
+    """Policy declared by a ``@cache_policy(...)`` decorator or ``# cache:`` comment."""
+    for dec in func_def.decorator_list:
+        target = dec.func if isinstance(dec, ast.Call) else dec
+        name = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", None)
+        if name == "cache_policy":
+            return _from_decorator(dec) if isinstance(dec, ast.Call) else DEFAULT_POLICY
+    for match in _COMMENT.finditer(code):
+        policy = _from_comment(match.group(1))
+        if policy is not None:
+            return policy
+    return DEFAULT_POLICY
+
+
+def combine(policies: Iterable[CachePolicy]) -> CachePolicy:
+    """The policy of a unit made of several nodes (a group).
+
+    Any ``never`` or ``watch`` member makes the unit run every time (its
+    members still use their own caches inside); otherwise the shortest TTL
+    applies. The smallest size cap is kept.
+    """
+    modes, seconds, max_bytes = set(), None, None
+    for p in policies:
+        modes.add(p.mode)
+        if p.seconds is not None:
+            seconds = p.seconds if seconds is None else min(seconds, p.seconds)
+        if p.max_bytes is not None:
+            max_bytes = p.max_bytes if max_bytes is None else min(max_bytes, p.max_bytes)
+    if modes & {"never", "watch"}:
+        return CachePolicy("never", None, max_bytes)
+    if "ttl" in modes:
+        return CachePolicy("ttl", seconds, max_bytes)
+    return CachePolicy("always", None, max_bytes)
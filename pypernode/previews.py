@@ -0,0 +1,136 @@
+"""Bounded previews of node outputs.
+
+A preview is a short label for the node and a summary for the inspector
+(type, length or shape, head and tail), built from a bounded part of the
+value so that cost does not grow with its size. The worker computes previews
+right after a node runs, so the UI thread never formats a full value. The
+complete value can still be viewed one page at a time with render_page.
+"""
+
+import itertools
+import reprlib
+from typing import Any, Dict
+
+from .values import is_array, is_table, preview_text
+
+PAGE_SIZE = 50
+_STR_PAGE = 4000
+_HEAD = 10
+_TAIL = 5
+
+_repr = reprlib.Repr()
+_repr.maxstring = 120
+_repr.maxother = 120
+_repr.maxlist = _repr.maxtuple = _repr.maxset = _repr.maxdict = 8
+_repr.maxlevel = 3
+
+
+def short_repr(value: Any) -> str:
+    return _repr.repr(value)
+
+
+class Preview:
+    __slots__ = ("label", "text", "pages")
+
+    def __init__(self, label: str, text: str, pages: int = 1):
+        self.label = label
+        self.text = text
+        self.pages = pages
+
+
+def _head_tail(items, total: int, fmt) -> str:
+    lines = [fmt(i, v) for i, v in enumerate(items[:_HEAD])]
+    if total > _HEAD + _TAIL:
+        lines.append(f"... {total - _HEAD - _TAIL} more ...")
+        start = total - _TAIL
+        lines.extend(fmt(start + i, v) for i, v in enumerate(items[start:]))
+    elif total > _HEAD:
+        lines.extend(fmt(_HEAD + i, v) for i, v in enumerate(items[_HEAD:]))
+    return "\n".join(lines)
+
+
+def summarize(value: Any) -> str:
+    if is_array(value):
+        import numpy
+
+        body = numpy.array2string(value, threshold=50, edgeitems=3)
+        return f"array dtype={value.dtype} shape={value.shape}\n{body}"
+    if is_table(value):
+        rows, cols = value.shape
+        dtypes = ", ".join(f"{c}: {d}" for c, d in itertools.islice(zip(value.columns, value.dtypes), 20))
+        if cols > 20:
+            dtypes += f", ... ({cols} columns)"
+        if rows > _HEAD + _TAIL:
+            body = value.head(_HEAD).to_string(max_cols=20) + "\n...\n" + value.tail(_TAIL).to_string(max_cols=20, header=False)
+        else:
+            body = value.to_string(max_cols=20)
+        return f"table {rows} rows × {cols} columns\n{dtypes}\n{body}"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}, {len(value)} items\n" + _head_tail(
+            value, len(value), lambda i, v: f"[{i}] {short_repr(v)}"
+        )
+    if isinstance(value, (set, frozenset)):
+        head = list(itertools.islice(value, _HEAD))
+        more = f"\n... {len(value) - len(head)} more ..." if len(value) > len(head) else ""
+        return f"{type(value).__name__}, {len(value)} items\n" + "\n".join(short_repr(v) for v in head) + more
+    if isinstance(value, dict):
+        head = itertools.islice(value.items(), _HEAD + _TAIL)
+        lines = [f"{short_repr(k)}: {short_repr(v)}" for k, v in head]
+        if len(value) > _HEAD + _TAIL:
+            lines.append(f"... {len(value) - _HEAD - _TAIL} more keys ...")
+        return f"dict, {len(value)} keys\n" + "\n".join(lines)
+    if isinstance(value, (str, bytes, bytearray)):
+        kind = "str" if isinstance(value, str) else "bytes"
+        if len(value) <= 1200:
+            return value if isinstance(value, str) else f"{kind}, {len(value)} bytes\n{value!r}"
+        head, tail = value[:1000], value[-200:]
+        if not isinstance(value, str):
+            head, tail = repr(head), repr(tail)
+        return f"{kind}, {len(value)} {'chars' if kind == 'str' else 'bytes'}\n{head}\n...\n{tail}"
+    return short_repr(value)
+
+
+def page_count(value: Any, page_size: int = PAGE_SIZE) -> int:
+    if is_array(value):
+        length = value.shape[0] if value.ndim else 1
+    elif is_table(value):
+        length = value.shape[0]
+    elif isinstance(value, (list, tuple, dict, set, frozenset)):
+        length = len(value)
+    elif isinstance(value, (str, bytes, bytearray)):
+        return max(1, -(-len(value) // _STR_PAGE))
+    else:
+        return 1
+    return max(1, -(-length // page_size))
+
+
+def render_page(value: Any, page: int, page_size: int = PAGE_SIZE) -> str:
+    """Full rendering of one page (0-based) of a value."""
+    start = page * page_size
+    stop = start + page_size
+    if is_array(value):
+        import numpy
+
+        if not value.ndim:
+            return numpy.array2string(value)
+        return numpy.array2string(value[start:stop], threshold=page_size * 64, max_line_width=200)
+    if is_table(value):
+        return value.iloc[start:stop].to_string()
+    if isinstance(value, (list, tuple)):
+        return "\n".join(f"[{start + i}] {v!r}" for i, v in enumerate(value[start:stop]))
+    if isinstance(value, dict):
+        return "\n".join(f"{k!r}: {v!r}" for k, v in itertools.islice(value.items(), start, stop))
+    if isinstance(value, (set, frozenset)):
+        return "\n".join(repr(v) for v in itertools.islice(value, start, stop))
+    if isinstance(value, (str, bytes, bytearray)):
+        chunk = value[page * _STR_PAGE:(page + 1) * _STR_PAGE]
+        return chunk if isinstance(chunk, str) else repr(chunk)
+    return repr(value)
+
+
+def make_preview(value: Any) -> Preview:
+    return Preview(preview_text(value), summarize(value), page_count(value))
+
+
+def make_previews(outputs: Dict[str, Any]) -> Dict[str, Preview]:
+    return {pin: make_preview(value) for pin, value in outputs.items()}
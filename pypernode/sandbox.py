@@ -0,0 +1,221 @@
+"""Running node code in a pool of sandbox processes.
+
+Node code normally runs inside the editor, so a node that crashes the
+interpreter (a segfault in an extension, running out of memory) takes the
+editor with it. A SandboxPool keeps a few long-lived worker processes
+instead. Each imports a list of modules once at startup, so heavy imports
+such as NumPy are not paid per task, and compiles each node's code once.
+
+Workers start in the background; each reports when its imports are done,
+and a task is only sent to a worker that is ready, so startup never counts
+against a task's time limit (``wait_ready`` waits for all of them).
+
+Tasks run under optional limits. ``time_limit`` (seconds) is enforced by
+the parent, which kills a worker that overruns. ``memory_limit`` (bytes)
+caps the worker's address space where the platform supports it. A worker
+is replaced after ``max_tasks`` tasks, and also when it dies or is killed.
+"""
+
+import importlib
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .policies import parse_size
+
+DEFAULT_PRELOAD = ("numpy", "pandas")
+
+
+class SandboxError(RuntimeError):
+    """A sandboxed task did not complete: its worker died or hit a limit."""
+
+
+def preload_from_env() -> List[str]:
+    """Modules to preload: ``$PYPERNODE_PRELOAD`` (comma separated) or the defaults."""
+    text = os.environ.get("PYPERNODE_PRELOAD")
+    if text is None:
+        return list(DEFAULT_PRELOAD)
+    return [name.strip() for name in text.split(",") if name.strip()]
+
+
+def _worker_main(conn, preload: List[str], memory_limit: Optional[int]) -> None:
+    if memory_limit:
+        try:
+            import resource
+
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        except (ImportError, ValueError, OSError):
+            pass
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+    from .interpreter import compile_function
+
+    conn.send(('ready', None))
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        code, name, inputs = task
+        try:
+            result = compile_function(code, name)(**inputs)
+            conn.send(('ok', result))
+        except MemoryError:
+            conn.send(('limit', "Out of memory (sandbox memory limit)"))
+        except Exception as e:
+            try:
+                conn.send(('error', str(e)))
+            except Exception:
+                return
+
+
+class _Worker:
+    def __init__(self, context, preload: List[str], memory_limit: Optional[int]):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, preload, memory_limit), daemon=True)
+        self.process.start()
+        child.close()
+        self.tasks = 0
+        self.ready = False
+        self._ready_lock = threading.Lock()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the worker to finish starting; False if it did not in time."""
+        with self._ready_lock:
+            if not self.ready:
+                try:
+                    if not self.conn.poll(timeout):
+                        return False
+                    self.conn.recv()
+                except (EOFError, OSError):
+                    # Died while starting; the next task finds out
+                    pass
+                self.ready = True
+        return True
+
+    def stop(self, kill: bool = False) -> None:
+        if not kill:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                kill = True
+        if kill and self.process.is_alive():
+            self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class SandboxPool:
+    """A fixed number of warm worker processes running node code."""
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        preload: Iterable[str] = DEFAULT_PRELOAD,
+        max_tasks: int = 500,
+        memory_limit=None,
+        time_limit: Optional[float] = None,
+    ):
+        self.size = size or max(1, min(4, os.cpu_count() or 1))
+        self.preload = list(preload)
+        self.max_tasks = max_tasks
+        self.memory_limit = parse_size(memory_limit)
+        self.time_limit = time_limit
+        # Workers must not inherit the state of a (possibly Qt) parent
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(self.size):
+            self._add_worker()
+
+    def _add_worker(self) -> None:
+        worker = _Worker(self._context, self.preload, self.memory_limit)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _retire(self, worker: _Worker, kill: bool) -> None:
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.stop(kill)
+        if not self._closed:
+            self._add_worker()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every worker has started and preloaded its modules;
+        False if some did not within ``timeout`` seconds."""
+        with self._lock:
+            workers = list(self._workers)
+        return all([worker.wait_ready(timeout) for worker in workers])
+
+    def _acquire(self) -> _Worker:
+        # Waits in short steps so a close() while waiting is noticed
+        while True:
+            if self._closed:
+                raise SandboxError("Sandbox pool is closed")
+            try:
+                worker = self._idle.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if self._closed:
+                raise SandboxError("Sandbox pool is closed")
+            return worker
+
+    def call(self, code: str, name: str, inputs: Dict[str, object]) -> object:
+        """Run function ``name`` of ``code`` on ``inputs`` in a worker."""
+        worker = self._acquire()
+        worker.wait_ready()
+        try:
+            worker.conn.send((code, name, inputs))
+        except (EOFError, OSError):
+            pass
+        except Exception as e:
+            # Pickling failed before anything was written
+            self._idle.put(worker)
+            raise SandboxError(f"Inputs cannot be passed to the sandbox: {e}") from e
+        try:
+            if not worker.conn.poll(self.time_limit):
+                self._retire(worker, kill=True)
+                raise SandboxError(f"Node exceeded the time limit of {self.time_limit:g} s")
+            status, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            worker.process.join(1)
+            exitcode = worker.process.exitcode
+            self._retire(worker, kill=True)
+            raise SandboxError(f"Sandbox worker died (exit code {exitcode})") from e
+
+        worker.tasks += 1
+        if worker.tasks >= self.max_tasks:
+            self._retire(worker, kill=False)
+        else:
+            self._idle.put(worker)
+        if status == 'limit':
+            raise SandboxError(value)
+        if status != 'ok':
+            raise RuntimeError(value)
+        return value
+
+    def close(self) -> None:
+        self._closed = True
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
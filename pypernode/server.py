@@ -0,0 +1,340 @@
+"""HTTP/JSON-RPC server that keeps graphs loaded and executes them on request.
+
+Graphs are loaded once; their execution plans, fused chains and node
+functions are prepared at load time, so a request only pays for the nodes
+whose results are not already in the shared ResultCache. Requests are served
+on separate threads and may run the same graph concurrently: each runs on
+its own snapshot of the graph's nodes (see NodeData.snapshot), with its own
+input overrides, sharing the prepared plan and the cache.
+
+Requests are JSON-RPC 2.0 calls POSTed to ``/``::
+
+    {"jsonrpc": "2.0", "id": 1, "method": "run",
+     "params": {"graph": "demo", "overrides": {"<node id>": {"a": 2}}}}
+
+Methods: ``load(name, path)``, ``unload(name)``, ``graphs()``,
+``run(graph, overrides=None, nodes=None)`` and ``metrics()``. ``GET /metrics``
+returns the metrics as plain JSON.
+"""
+
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from .cache import ResultCache, budget_from_env
+from .engine import GraphExecutor
+from .fusion import fused_callable
+from .graph import Graph, coerce_value
+from .graph_io import iter_graph
+from .models import snapshot
+from .values import to_jsonable
+
+DEFAULT_PORT = 8080
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+EXECUTION_ERROR = -32000
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class LoadedGraph:
+    """A graph with a warm execution plan."""
+
+    def __init__(self, name: str, path: str, cache: ResultCache):
+        self.name = name
+        self.path = path
+        self.graph = Graph()
+        self.unknown = self.graph.populate(iter_graph(path))
+        self.executor = GraphExecutor(self.graph.nodes, self.graph.connections, cache=cache)
+        self.warm()
+
+    def warm(self) -> None:
+        executor = self.executor
+        for head in executor.chains():
+            fused_callable(executor.plan.shapes[head])
+        for node in self.graph.nodes.values():
+            if node.is_group:
+                node.group_runner()
+            else:
+                node.function()
+
+    def request_executor(self) -> GraphExecutor:
+        """An executor for one request, over its own copies of the nodes."""
+        executor = GraphExecutor(snapshot(self.graph.nodes), self.graph.connections, cache=self.executor.cache)
+        executor._plan = self.executor.plan
+        return executor
+
+    def coerce_overrides(self, overrides: Dict[str, Dict[str, object]]) -> Dict[str, Dict[str, object]]:
+        if not isinstance(overrides, dict):
+            raise RpcError(INVALID_PARAMS, "overrides must be an object of node id -> {input: value}")
+        result = {}
+        for nid, values in overrides.items():
+            node = self.graph.nodes.get(nid)
+            if node is None:
+                raise RpcError(INVALID_PARAMS, f"Unknown node: {nid}")
+            if not isinstance(values, dict):
+                raise RpcError(INVALID_PARAMS, f"Overrides of node {nid} must be an object of input -> value")
+            types = {sock.name: sock.type for sock in node.input_defs}
+            for name in values:
+                if name not in types:
+                    raise RpcError(INVALID_PARAMS, f"Node {nid} has no input {name!r}")
+            try:
+                result[nid] = {name: coerce_value(types[name], v) for name, v in values.items()}
+            except (TypeError, ValueError) as e:
+                raise RpcError(INVALID_PARAMS, f"Invalid override for node {nid}: {e}")
+        return result
+
+
+class Metrics:
+    """Request counts, latency percentiles and recent throughput."""
+
+    def __init__(self, window: float = 60.0, samples: int = 2048):
+        self.window = window
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.per_graph: Dict[str, int] = {}
+        self._latencies = deque(maxlen=samples)
+        self._finished = deque()
+        self._lock = threading.Lock()
+
+    def begin(self) -> float:
+        with self._lock:
+            self.in_flight += 1
+        return time.perf_counter()
+
+    def end(self, started: float, graph: str, ok: bool) -> None:
+        elapsed = time.perf_counter() - started
+        now = time.time()
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            self.per_graph[graph] = self.per_graph.get(graph, 0) + 1
+            self._latencies.append(elapsed)
+            self._finished.append(now)
+            while self._finished and self._finished[0] < now - self.window:
+                self._finished.popleft()
+
+    def snapshot(self) -> Dict[str, object]:
+        now = time.time()
+        with self._lock:
+            latencies = sorted(self._latencies)
+            recent = sum(1 for t in self._finished if t >= now - self.window)
+            span = min(self.window, now - self.started) or 1.0
+
+            def pct(p: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+
+            return {
+                "uptime_s": round(now - self.started, 1),
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "per_graph": dict(self.per_graph),
+                "throughput_rps": round(recent / span, 3),
+                "latency_ms": {
+                    "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+                    "p50": pct(0.5),
+                    "p95": pct(0.95),
+                    "p99": pct(0.99),
+                    "max": round(latencies[-1] * 1000, 3) if latencies else None,
+                },
+            }
+
+
+class GraphService:
+    """The RPC methods, independent of the transport."""
+
+    def __init__(self, cache: Optional[ResultCache] = None):
+        self.cache = cache if cache is not None else ResultCache(max_bytes=budget_from_env())
+        self.graphs: Dict[str, LoadedGraph] = {}
+        self.metrics = Metrics()
+        self._lock = threading.Lock()
+
+    def load(self, name: str, path: str) -> Dict[str, object]:
+        _check_type(name, str, "name")
+        _check_type(path, str, "path")
+        try:
+            loaded = LoadedGraph(name, path, self.cache)
+        except Exception as e:
+            raise RpcError(EXECUTION_ERROR, f"Could not load {path}: {e}")
+        with self._lock:
+            self.graphs[name] = loaded
+        return {"name": name, "nodes": len(loaded.graph.nodes), "unknown_types": loaded.unknown}
+
+    def unload(self, name: str) -> bool:
+        with self._lock:
+            return self.graphs.pop(name, None) is not None
+
+    def list_graphs(self) -> List[Dict[str, object]]:
+        return [
+            {"name": g.name, "path": g.path, "nodes": len(g.graph.nodes)}
+            for g in list(self.graphs.values())
+        ]
+
+    def run(
+        self,
+        graph: str,
+        overrides: Optional[Dict[str, Dict[str, object]]] = None,
+        nodes: Optional[List[str]] = None,
+    ) -> Dict[str, object]:
+        _check_type(graph, str, "graph")
+        if nodes is not None and not (isinstance(nodes, list) and all(isinstance(nid, str) for nid in nodes)):
+            raise RpcError(INVALID_PARAMS, "nodes must be a list of node ids")
+        loaded = self.graphs.get(graph)
+        if loaded is None:
+            raise RpcError(INVALID_PARAMS, f"Unknown graph: {graph}")
+        started = self.metrics.begin()
+        ok = False
+        try:
+            coerced = loaded.coerce_overrides(overrides or {})
+            unknown = [nid for nid in nodes or [] if nid not in loaded.graph.nodes]
+            if unknown:
+                raise RpcError(INVALID_PARAMS, f"Unknown nodes: {', '.join(unknown)}")
+            try:
+                # Only what the requested nodes depend on is evaluated
+                results = loaded.request_executor().run(coerced, targets=nodes)
+            except Exception as e:
+                raise RpcError(EXECUTION_ERROR, str(e))
+            ok = True
+        finally:
+            self.metrics.end(started, graph, ok)
+        wanted = nodes if nodes is not None else list(results)
+        return {nid: to_jsonable(results[nid]) for nid in wanted if nid in results}
+
+    def get_metrics(self) -> Dict[str, object]:
+        data = self.metrics.snapshot()
+        data["cache_entries"] = len(self.cache)
+        data["graphs"] = len(self.graphs)
+        return data
+
+    def dispatch(self, method: str, params) -> object:
+        handlers = {
+            "load": self.load,
+            "unload": self.unload,
+            "graphs": self.list_graphs,
+            "run": self.run,
+            "metrics": self.get_metrics,
+        }
+        handler = handlers.get(method)
+        if handler is None:
+            raise RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+        if params is not None and not isinstance(params, (dict, list)):
+            raise RpcError(INVALID_PARAMS, "params must be an object or an array")
+        try:
+            if isinstance(params, dict):
+                inspect.signature(handler).bind(**params)
+            else:
+                inspect.signature(handler).bind(*(params or []))
+        except TypeError as e:
+            raise RpcError(INVALID_PARAMS, str(e))
+        if isinstance(params, dict):
+            return handler(**params)
+        return handler(*(params or []))
+
+    def handle(self, request) -> Optional[Dict[str, object]]:
+        """Answer one JSON-RPC request object; notifications get None."""
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or "method" not in request:
+            return _error(None, INVALID_REQUEST, "Invalid request")
+        req_id = request.get("id")
+        try:
+            result = self.dispatch(request["method"], request.get("params"))
+        except RpcError as e:
+            reply = _error(req_id, e.code, str(e))
+        except Exception as e:
+            reply = _error(req_id, INTERNAL_ERROR, f"Internal error: {e}")
+        else:
+            reply = {"jsonrpc": "2.0", "id": req_id, "result": result}
+        # Notifications are never answered, not even with an error
+        return reply if "id" in request else None
+
+
+def _check_type(value, expected: type, name: str) -> None:
+    if not isinstance(value, expected):
+        raise RpcError(INVALID_PARAMS, f"{name} must be a {expected.__name__}")
+
+
+def _error(req_id, code: int, message: str) -> Dict[str, object]:
+    return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
+
+
+class _RpcHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload=None) -> None:
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            self._reply(200, self.server.service.get_metrics())
+        else:
+            self._reply(404, {"error": "Not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            self._reply(200, _error(None, PARSE_ERROR, "Parse error"))
+            return
+
+        service = self.server.service
+        if isinstance(request, list):
+            replies = [r for r in (service.handle(item) for item in request) if r is not None]
+            if replies:
+                self._reply(200, replies)
+            else:
+                self._reply(204)
+            return
+        reply = service.handle(request)
+        if reply is None:
+            self._reply(204)
+        else:
+            self._reply(200, reply)
+
+
+class GraphServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, service: Optional[GraphService] = None):
+        super().__init__((host, port), _RpcHandler)
+        self.service = service or GraphService()
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, graphs: Optional[Dict[str, str]] = None) -> None:
+    with GraphServer(host, port) as server:
+        for name, path in (graphs or {}).items():
+            info = server.service.load(name, path)
+            print(f"loaded {name}: {info['nodes']} nodes", flush=True)
+        bound_host, bound_port = server.server_address[:2]
+        print(f"pypernode server listening on http://{bound_host}:{bound_port}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,206 @@
+"""Parameter sweeps: run a graph for many combinations of input values.
+
+The graph is split in two. Nodes that do not depend on any swept input run
+once, in this process. The nodes downstream of the swept inputs form a
+smaller subgraph; its inputs from the fixed part become overrides. That
+subgraph is shipped once to each process of a pool, and every sweep point is
+then only its override values.
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .cache import ResultCache
+from .engine import GraphExecutor, build_plan
+from .graph import coerce_value
+from .node_types import ValueType
+
+# (node id, input name) -> values
+Grid = Dict[Tuple[str, str], Sequence[object]]
+Overrides = Dict[str, Dict[str, object]]
+
+
+def parse_values(text: str, value_type: ValueType = ValueType.ANY) -> List[object]:
+    """Values from a comma separated list, or ``start:stop:step`` for numbers
+    (``stop`` included when reached exactly)."""
+    text = text.strip()
+    if value_type == ValueType.NUMBER and text.count(":") == 2 and "," not in text:
+        start, stop, step = (float(p) for p in text.split(":"))
+        if step == 0:
+            raise ValueError("Step must not be zero")
+        count = int((stop - start) / step + 1e-9) + 1
+        return [start + i * step for i in range(max(count, 0))]
+    return [coerce_value(value_type, part.strip()) for part in text.split(",") if part.strip()]
+
+
+def input_type(node, name: str) -> ValueType:
+    return next(sock.type for sock in node.input_defs if sock.name == name)
+
+
+def grid_points(grid: Grid) -> List[Overrides]:
+    """Every combination of the values in ``grid`` as executor overrides."""
+    axes = list(grid.items())
+    points = []
+    for combo in itertools.product(*(values for _, values in axes)):
+        point: Overrides = {}
+        for ((nid, name), _), value in zip(axes, combo):
+            point.setdefault(nid, {})[name] = value
+        points.append(point)
+    return points
+
+
+def _descendants(adj: Dict[str, List[str]], roots: Iterable[str]) -> set:
+    seen, stack = set(), list(roots)
+    while stack:
+        nid = stack.pop()
+        if nid in seen:
+            continue
+        seen.add(nid)
+        stack.extend(adj[nid])
+    return seen
+
+
+# Per process: the executor for the swept part of the graph
+_worker_executor: Optional[GraphExecutor] = None
+_worker_fixed: Overrides = {}
+
+
+def _init_worker(
+    records: List[Dict[str, object]], connections: List[Dict[str, object]], fixed: Overrides, cache=None
+) -> None:
+    global _worker_executor, _worker_fixed
+    from .graph import Graph
+
+    graph = Graph()
+    graph.populate([('node', r) for r in records] + [('connection', c) for c in connections])
+    _worker_executor = GraphExecutor(graph.nodes, graph.connections, cache=cache)
+    _worker_fixed = fixed
+
+
+def _merge(fixed: Overrides, point: Overrides) -> Overrides:
+    merged = {nid: dict(values) for nid, values in fixed.items()}
+    for nid, values in point.items():
+        merged.setdefault(nid, {}).update(values)
+    return merged
+
+
+def _run_point(point: Overrides) -> Dict[str, Dict[str, object]]:
+    return _worker_executor.run(_merge(_worker_fixed, point))
+
+
+class SweepResult:
+    """Sweep results as a table: one row per point, with a column per swept
+    input followed by a column per output of the selected nodes."""
+
+    def __init__(self, columns: List[str], rows: List[List[object]]):
+        self.columns = columns
+        self.rows = rows
+
+    def records(self) -> List[Dict[str, object]]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def to_dataframe(self):
+        import pandas
+
+        return pandas.DataFrame(self.rows, columns=self.columns)
+
+    def write_csv(self, path: str) -> None:
+        import csv
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            writer.writerows(self.rows)
+
+
+def _labels(nodes, items: Iterable[Tuple[str, str]]) -> List[str]:
+    """Column names ``type.socket``, qualified by node id where ambiguous."""
+    items = list(items)
+    plain = [f"{nodes[nid].type}.{name}" for nid, name in items]
+    return [
+        label if plain.count(label) == 1 else f"{nodes[nid].type}[{nid[:8]}].{name}"
+        for label, (nid, name) in zip(plain, items)
+    ]
+
+
+def run_sweep(
+    nodes,
+    connections: List[Dict[str, object]],
+    grid: Grid,
+    outputs: Optional[List[str]] = None,
+    processes: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    mp_context=None,
+    cache: Optional[ResultCache] = None,
+) -> SweepResult:
+    """Run the graph once per combination of the values in ``grid``.
+
+    ``outputs`` selects the nodes whose results go into the table (default:
+    nodes that feed nothing). ``processes`` is the pool size; 0 runs every
+    point in this process. ``mp_context`` is passed to the process pool.
+    ``progress(done, total)`` is called after each point. ``cache`` holds
+    the results of the part run in this process (pass the caller's cache to
+    stay within its budget); pool processes keep their own.
+    """
+    plan = build_plan(nodes, connections)
+    for nid, name in grid:
+        if nid not in nodes or name not in nodes[nid].inputs:
+            raise ValueError(f"No input {name!r} on node {nid}")
+        if name in plan.input_map[nid]:
+            raise ValueError(f"Input {name!r} of {nodes[nid].type} is connected and cannot be swept")
+    grid = {(nid, name): [coerce_value(input_type(nodes[nid], name), v) for v in values] for (nid, name), values in grid.items()}
+    swept = {nid for nid, _ in grid}
+    dependent = _descendants(plan.adj, swept)
+    if outputs is None:
+        feeding = {c['start_node'] for c in connections}
+        outputs = [nid for nid in plan.order if nid not in feeding]
+
+    # The part that does not depend on the sweep runs once
+    fixed_nodes = {nid: n for nid, n in nodes.items() if nid not in dependent}
+    fixed_conns = [c for c in connections if c['start_node'] in fixed_nodes and c['end_node'] in fixed_nodes]
+    fixed_results = GraphExecutor(fixed_nodes, fixed_conns, cache=cache).run() if fixed_nodes else {}
+
+    # Its results enter the swept part as overrides
+    boundary: Overrides = {}
+    for nid in dependent:
+        for in_name, (src, pin) in plan.input_map[nid].items():
+            if src not in dependent:
+                boundary.setdefault(nid, {})[in_name] = fixed_results[src][pin]
+    records = [
+        {"id": nid, "type": nodes[nid].type, "x": 0, "y": 0, "params": nodes[nid].params, "code": nodes[nid].code}
+        for nid in plan.order if nid in dependent
+    ]
+    inner_conns = [c for c in connections if c['start_node'] in dependent and c['end_node'] in dependent]
+
+    points = grid_points(grid)
+    results: List[Dict[str, Dict[str, object]]] = []
+    if processes == 0 or len(points) < 2:
+        _init_worker(records, inner_conns, boundary, cache)
+        for point in points:
+            results.append(_run_point(point))
+            if progress:
+                progress(len(results), len(points))
+    else:
+        workers = processes or os.cpu_count() or 1
+        chunksize = max(1, len(points) // (4 * workers))
+        with ProcessPoolExecutor(
+            workers, mp_context=mp_context, initializer=_init_worker, initargs=(records, inner_conns, boundary)
+        ) as pool:
+            for outs in pool.map(_run_point, points, chunksize=chunksize):
+                results.append(outs)
+                if progress:
+                    progress(len(results), len(points))
+
+    param_items = list(grid)
+    output_items = [(nid, pin) for nid in outputs for pin in nodes[nid].outputs]
+    columns = _labels(nodes, param_items) + _labels(nodes, output_items)
+    rows = []
+    for point, outs in zip(points, results):
+        row = [point[nid][name] for nid, name in param_items]
+        for nid, pin in output_items:
+            source = outs.get(nid) if nid in dependent else fixed_results.get(nid)
+            row.append((source or {}).get(pin))
+        rows.append(row)
+    return SweepResult(columns, rows)
@@ -0,0 +1,117 @@
+"""Recorded node runtimes, used to schedule and to predict runs.
+
+A runtime is recorded under the node's code hash and the size of its inputs
+rounded to a power of two, as a moving average, so the same node on much
+larger data gets its own estimate. Estimates fall back to the average over
+all sizes of that code.
+
+From per-node estimates, remaining_paths gives each node the longest chain of
+work from it to a sink. Starting ready nodes in that order keeps the slowest
+chain busy first when there are fewer workers than ready branches.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+from .values import is_array, is_table
+
+DEFAULT_SECONDS = 0.001
+
+_ALPHA = 0.3
+
+
+def size_hint(value: object) -> int:
+    """Cheap measure of how much data a value holds (elements, rows or bytes)."""
+    if is_array(value):
+        return int(value.size)
+    if is_table(value):
+        return int(value.shape[0])
+    try:
+        return len(value)
+    except TypeError:
+        return 1
+
+
+def size_bucket(inputs: Dict[str, object]) -> int:
+    return sum(size_hint(v) for v in inputs.values()).bit_length()
+
+
+class TimingStore:
+    """Moving averages of node runtimes, optionally kept in a JSON file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._times: Dict[str, float] = {}
+        self._by_code: Dict[str, float] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def record(self, code_hash: str, inputs: Dict[str, object], seconds: float) -> None:
+        key = f"{code_hash}/{size_bucket(inputs)}"
+        with self._lock:
+            for table, k in ((self._times, key), (self._by_code, code_hash)):
+                old = table.get(k)
+                table[k] = seconds if old is None else old + _ALPHA * (seconds - old)
+            self._dirty = True
+
+    def estimate(self, code_hash: str, inputs: Dict[str, object]) -> Optional[float]:
+        """Expected runtime in seconds, or None if this code never ran."""
+        with self._lock:
+            seconds = self._times.get(f"{code_hash}/{size_bucket(inputs)}")
+            return seconds if seconds is not None else self._by_code.get(code_hash)
+
+    def load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._times = {k: float(v) for k, v in data.get('times', {}).items()}
+            self._by_code = {k: float(v) for k, v in data.get('by_code', {}).items()}
+
+    def save(self) -> None:
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            data = {'times': dict(self._times), 'by_code': dict(self._by_code)}
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+def remaining_paths(order: Iterable[str], adj: Dict[str, list], durations: Dict[str, float]) -> Dict[str, float]:
+    """Per node, its own duration plus the longest path below it."""
+    remaining: Dict[str, float] = {}
+    for nid in reversed(list(order)):
+        remaining[nid] = durations[nid] + max((remaining[n] for n in adj[nid]), default=0.0)
+    return remaining
+
+
+def predict(order: Iterable[str], adj: Dict[str, list], durations: Dict[str, float], workers: int = 1) -> float:
+    """Expected wall time: the total work spread over ``workers``, but never
+    less than the critical path."""
+    total = sum(durations.values())
+    if workers <= 1:
+        return total
+    critical = max(remaining_paths(order, adj, durations).values(), default=0.0)
+    return max(critical, total / workers)
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    if seconds < 120:
+        return f"{seconds:.1f} s"
+    return f"{seconds / 60:.1f} min"
+
@@ -0,0 +1,76 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from ..interpreter import parse_function_cached
+
+
+class ParseSignals(QObject):
+    parsed = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class ParseWorker(QRunnable):
+    def __init__(self, generation: int, code: str):
+        super().__init__()
+        self.generation = generation
+        self.code = code
+        self.signals = ParseSignals()
+
+    def run(self):
+        try:
+            definition = parse_function_cached(self.code)
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.parsed.emit(self.generation, definition)
+
+
+class DebouncedCodeParser(QObject):
+    """Parses node code off the UI thread once the user stops typing.
+
+    Only the most recent edit is reported; results of parses that were
+    overtaken by newer keystrokes are dropped.
+    """
+
+    definition_ready = pyqtSignal(object)
+    parse_failed = pyqtSignal(str)
+
+    def __init__(self, delay_ms: int = 300, parent=None):
+        super().__init__(parent)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._start_parse)
+        self._pending_code = None
+        self._generation = 0
+        self._workers = set()
+
+    def schedule(self, code: str) -> None:
+        self._pending_code = code
+        self._generation += 1
+        self._timer.start()
+
+    def cancel(self) -> None:
+        self._timer.stop()
+        self._pending_code = None
+        self._generation += 1
+
+    def _start_parse(self):
+        if self._pending_code is None:
+            return
+        worker = ParseWorker(self._generation, self._pending_code)
+        self._pending_code = None
+        worker.signals.parsed.connect(self._on_parsed)
+        worker.signals.failed.connect(self._on_failed)
+        # Keep the signals object alive until the queued result is delivered.
+        self._workers.add(worker.signals)
+        QThreadPool.globalInstance().start(worker)
+
+    def _on_parsed(self, generation, definition):
+        self._workers.discard(self.sender())
+        if generation == self._generation:
+            self.definition_ready.emit(definition)
+
+    def _on_failed(self, generation, message):
+        self._workers.discard(self.sender())
+        if generation == self._generation:
+            self.parse_failed.emit(message)
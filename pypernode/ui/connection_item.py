@@ -9,6 +9,7 @@ class ConnectionItem(QGraphicsPathItem):
     def __init__(self, master):
         super().__init__()
         self.master = master
+        self.key = None
         self.setZValue(-1)
         self.setAcceptHoverEvents(True)
         self.setFlag(QGraphicsPathItem.ItemIsSelectable, True)
@@ -0,0 +1,146 @@
+from collections import defaultdict
+from typing import Dict, Set, Tuple
+
+from PyQt5.QtCore import QObject, QRectF, QTimer
+
+
+class SpatialGrid:
+    """Uniform grid over node positions for cheap rectangle queries."""
+
+    def __init__(self, cell_size: float = 1024.0):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Set[str]] = defaultdict(set)
+        self.positions: Dict[str, Tuple[float, float]] = {}
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, key: str, x: float, y: float) -> None:
+        if key in self.positions:
+            self.remove(key)
+        self.positions[key] = (x, y)
+        self.cells[self._cell(x, y)].add(key)
+
+    def remove(self, key: str) -> None:
+        pos = self.positions.pop(key, None)
+        if pos is None:
+            return
+        cell = self._cell(*pos)
+        self.cells[cell].discard(key)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def query(self, rect: QRectF) -> Set[str]:
+        x0, y0 = self._cell(rect.left(), rect.top())
+        x1, y1 = self._cell(rect.right(), rect.bottom())
+        found = set()
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            cells = (c for c in self.cells if x0 <= c[0] <= x1 and y0 <= c[1] <= y1)
+        else:
+            cells = ((cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1))
+        for cell in cells:
+            for key in self.cells.get(cell, ()):
+                x, y = self.positions[key]
+                if rect.contains(x, y):
+                    found.add(key)
+        return found
+
+    def bounds(self) -> QRectF:
+        if not self.positions:
+            return QRectF()
+        xs = [c[0] for c in self.cells]
+        ys = [c[1] for c in self.cells]
+        s = self.cell_size
+        return QRectF(min(xs) * s, min(ys) * s, (max(xs) - min(xs) + 1) * s, (max(ys) - min(ys) + 1) * s)
+
+    def clear(self) -> None:
+        self.cells.clear()
+        self.positions.clear()
+
+
+class ViewportCuller(QObject):
+    """Materializes graphics items only for nodes near the visible viewport.
+
+    Nodes entering the (padded) viewport are queued and created a batch at a
+    time from an idle timer, so panning never blocks on a large region. Items
+    that drift far off-screen are released again; the graph model keeps
+    their state.
+    """
+
+    def __init__(self, master, view, margin: float = 600.0, release_margin: float = 2400.0, batch_size: int = 200):
+        super().__init__()
+        self.master = master
+        self.view = view
+        self.margin = margin
+        self.release_margin = release_margin
+        self.batch_size = batch_size
+        self.grid = SpatialGrid()
+        self._pending = []
+
+        self._idle = QTimer(self)
+        self._idle.setInterval(0)
+        self._idle.timeout.connect(self._materialize_batch)
+
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(30)
+        self._refresh_timer.timeout.connect(self.refresh)
+
+    def visible_rect(self) -> QRectF:
+        return self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+
+    def track(self, nid: str, x: float, y: float) -> None:
+        self.grid.insert(nid, x, y)
+
+    def untrack(self, nid: str) -> None:
+        self.grid.remove(nid)
+
+    def schedule_refresh(self) -> None:
+        self._refresh_timer.start()
+
+    def refresh(self) -> None:
+        visible = self.visible_rect()
+        self.update_scene_rect()
+
+        wanted_rect = visible.adjusted(-self.margin, -self.margin, self.margin, self.margin)
+        keep_rect = visible.adjusted(
+            -self.release_margin, -self.release_margin, self.release_margin, self.release_margin
+        )
+        wanted = self.grid.query(wanted_rect)
+
+        for nid, item in list(self.master.items_by_id.items()):
+            if item.isSelected() or item.is_code_visible:
+                continue
+            if not keep_rect.contains(item.pos()):
+                self.master.release_node(nid)
+
+        center = visible.center()
+        missing = [nid for nid in wanted if nid not in self.master.items_by_id]
+        missing.sort(key=lambda n: (
+            abs(self.grid.positions[n][0] - center.x()) + abs(self.grid.positions[n][1] - center.y())
+        ))
+        self._pending = missing
+        if self._pending:
+            self._idle.start()
+
+    def _materialize_batch(self) -> None:
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        for nid in batch:
+            if nid in self.master.nodes and nid not in self.master.items_by_id:
+                self.master.materialize_node(nid)
+        if not self._pending:
+            self._idle.stop()
+
+    def update_scene_rect(self) -> None:
+        bounds = self.grid.bounds()
+        if bounds.isNull():
+            return
+        pad = self.release_margin
+        rect = bounds.adjusted(-pad, -pad, pad, pad).united(self.master.scene.itemsBoundingRect())
+        if rect != self.master.scene.sceneRect():
+            self.master.scene.setSceneRect(rect)
+
+    def clear(self) -> None:
+        self._idle.stop()
+        self._pending = []
+        self.grid.clear()
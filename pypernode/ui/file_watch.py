@@ -0,0 +1,95 @@
+from PyQt5.QtCore import QObject, QTimer
+
+from ..engine import GraphExecutor, output_nodes
+from ..watch import FileWatcher, rerun_targets
+
+
+class WatchMode(QObject):
+    """Runs the affected part of the graph again when files read by ``watch``
+    nodes change (see pypernode.watch).
+
+    Files are polled from a timer on the UI thread. Once a change is seen,
+    polling continues every ``debounce_ms`` until the files are quiet, and
+    the whole burst triggers one run. Changes seen while a run is in
+    progress are handled when it finishes.
+    """
+
+    def __init__(self, master, interval_ms: int = 500, debounce_ms: int = 300):
+        super().__init__(master)
+        self.master = master
+        self.files = FileWatcher()
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(interval_ms)
+        self._poll_timer.timeout.connect(self._poll)
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(debounce_ms)
+        self._settle_timer.timeout.connect(self._settle)
+        self._changed = set()
+        self._running = False
+        self._pending = False
+
+    def start(self) -> None:
+        # A first run tells which files the graph reads
+        self._run(None)
+        self._poll_timer.start()
+
+    def stop(self) -> None:
+        self._poll_timer.stop()
+        self._settle_timer.stop()
+        self._changed.clear()
+        self._pending = False
+
+    def refresh(self) -> None:
+        nodes = self.master.nodes
+        executor = GraphExecutor(nodes, self.master.get_logical_conns())
+        results = {nid: node.last_output for nid, node in nodes.items() if node.has_output}
+        try:
+            self.files.watch(executor.watched_files(results))
+        except Exception:
+            # The graph is being edited into an invalid state (a cycle)
+            pass
+
+    def _poll(self) -> None:
+        if self._settle_timer.isActive():
+            return
+        changed = self.files.changes()
+        if changed:
+            self._changed |= changed
+            self._settle_timer.start()
+
+    def _settle(self) -> None:
+        changed = self.files.changes()
+        if changed:
+            self._changed |= changed
+            self._settle_timer.start()
+            return
+        self._trigger()
+
+    def _trigger(self) -> None:
+        if self._running:
+            self._pending = True
+            return
+        readers = self.files.affected(self._changed)
+        self._changed.clear()
+        executor = GraphExecutor(self.master.nodes, self.master.get_logical_conns())
+        limit = (output_nodes(self.master.nodes) or None) if self.master.act_outputs_only.isChecked() else None
+        try:
+            targets = rerun_targets(executor, readers, limit)
+        except Exception:
+            return
+        if targets:
+            self._run(targets)
+
+    def _run(self, targets) -> None:
+        self._running = True
+        worker = self.master.run_workflow(targets=targets)
+        worker.signals.finished.connect(self._on_run_done)
+        worker.signals.error.connect(self._on_run_done)
+
+    def _on_run_done(self, *_) -> None:
+        self._running = False
+        self.refresh()
+        if self._pending and self._poll_timer.isActive():
+            self._pending = False
+            self._trigger()
@@ -1,23 +1,84 @@
-import json
 from datetime import date
 from typing import Any
 
-from PyQt5.QtCore import QDate
+from PyQt5.QtCore import QDate, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     QCheckBox,
+    QComboBox,
     QDateEdit,
+    QDialog,
     QDoubleSpinBox,
     QFormLayout,
+    QHBoxLayout,
     QLabel,
+    QPushButton,
     QTextEdit,
     QVBoxLayout,
     QWidget,
 )
 
 from ..node_types import ValueType
+from ..previews import page_count, render_page
+
+
+class ValueViewer(QDialog):
+    """Full view of a node's outputs, rendered one page at a time."""
+
+    def __init__(self, node_data, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"{node_data.type} ({node_data.id[-4:]})")
+        self.resize(640, 480)
+        self.outputs = node_data.last_output
+        self.page = 0
+        self.pages = 1
+
+        layout = QVBoxLayout(self)
+        self.cmb_pin = QComboBox()
+        self.cmb_pin.addItems(list(self.outputs))
+        self.cmb_pin.currentIndexChanged.connect(self.on_pin_changed)
+        layout.addWidget(self.cmb_pin)
+        self.cmb_pin.setVisible(len(self.outputs) > 1)
+
+        self.txt_value = QTextEdit()
+        self.txt_value.setReadOnly(True)
+        self.txt_value.setLineWrapMode(QTextEdit.NoWrap)
+        self.txt_value.setStyleSheet("font-family: Consolas; font-size: 11px;")
+        layout.addWidget(self.txt_value)
+
+        row = QHBoxLayout()
+        self.btn_prev = QPushButton("< Prev")
+        self.btn_prev.clicked.connect(lambda: self.show_page(self.page - 1))
+        self.btn_next = QPushButton("Next >")
+        self.btn_next.clicked.connect(lambda: self.show_page(self.page + 1))
+        self.lbl_page = QLabel()
+        row.addWidget(self.btn_prev)
+        row.addStretch()
+        row.addWidget(self.lbl_page)
+        row.addStretch()
+        row.addWidget(self.btn_next)
+        layout.addLayout(row)
+
+        self.on_pin_changed()
+
+    def current_value(self):
+        return self.outputs.get(self.cmb_pin.currentText())
+
+    def on_pin_changed(self):
+        self.pages = page_count(self.current_value())
+        self.show_page(0)
+
+    def show_page(self, page):
+        self.page = max(0, min(page, self.pages - 1))
+        self.txt_value.setPlainText(render_page(self.current_value(), self.page))
+        self.lbl_page.setText(f"Page {self.page + 1} of {self.pages}")
+        self.btn_prev.setEnabled(self.page > 0)
+        self.btn_next.setEnabled(self.page < self.pages - 1)
 
 
 class InspectorWidget(QWidget):
+    code_edited = pyqtSignal(object)
+    evaluate_requested = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout(self)
@@ -35,6 +96,12 @@ class InspectorWidget(QWidget):
         self.txt_code.setStyleSheet("font-family: Consolas; font-size: 11px;")
         self.txt_code.setMaximumHeight(150)
         self.txt_code.textChanged.connect(self.on_code_changed)
+        # Code edits are applied once typing pauses, like the inline editor's
+        self._code_timer = QTimer(self)
+        self._code_timer.setSingleShot(True)
+        self._code_timer.setInterval(300)
+        self._code_timer.timeout.connect(self.apply_code_edit)
+        self._code_node = None
         self.layout.addWidget(self.txt_code)
 
         self.layout.addWidget(QLabel("Execution Result:"))
@@ -43,6 +110,11 @@ class InspectorWidget(QWidget):
         self.txt_log.setMaximumHeight(100)
         self.layout.addWidget(self.txt_log)
 
+        self.btn_full = QPushButton("Show Full...")
+        self.btn_full.setEnabled(False)
+        self.btn_full.clicked.connect(self.show_full_value)
+        self.layout.addWidget(self.btn_full)
+
         self.layout.addStretch()
 
     def _create_editor(self, value_type: ValueType, value: Any):
@@ -75,13 +147,12 @@ class InspectorWidget(QWidget):
         return te, te.setPlainText
 
     def set_node(self, node_data):
+        self.apply_code_edit()
         self.current_node = node_data
         self.lbl_type.setText(f"{node_data.type} ({node_data.id[-4:]})")
 
-        while self.form_layout.count():
-            child = self.form_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
+        while self.form_layout.rowCount():
+            self.form_layout.removeRow(0)
 
         for sock in node_data.input_defs:
             widget, _ = self._create_editor(sock.type, node_data.params.get(sock.name, sock.default))
@@ -98,20 +169,36 @@ class InspectorWidget(QWidget):
                 )
             self.form_layout.addRow(sock.name, widget)
 
-        self.txt_code.blockSignals(True)
-        self.txt_code.setPlainText(node_data.code)
-        self.txt_code.blockSignals(False)
+        self.sync_code()
 
+        self.btn_full.setEnabled(node_data.has_output and not node_data.last_error)
         if node_data.last_error:
             self.txt_log.setStyleSheet("color: #FF5555;")
             self.txt_log.setPlainText(node_data.last_error)
-        elif node_data.last_output:
+        elif node_data.has_output:
+            previews = node_data.previews()
             self.txt_log.setStyleSheet("color: #55FF55;")
-            self.txt_log.setPlainText(json.dumps(node_data.last_output, indent=2, default=str))
+            if len(previews) == 1:
+                text = next(iter(previews.values())).text
+            else:
+                text = "\n".join(f"{pin}: {p.text}" for pin, p in previews.items())
+            if node_data.evicted:
+                text += "\n\n(Evicted from the result cache; Show Full... computes it again.)"
+            self.txt_log.setPlainText(text)
         else:
             self.txt_log.setStyleSheet("color: #AAA;")
             self.txt_log.setPlainText("Not executed yet.")
 
+    def show_full_value(self):
+        node = self.current_node
+        if node is None or not node.has_output:
+            return
+        if node.evicted:
+            # The outputs left the result cache; compute them again, then view
+            self.evaluate_requested.emit(node.id)
+            return
+        ValueViewer(node, self).exec_()
+
     def on_param_changed(self, key, val):
         if not self.current_node:
             return
@@ -137,16 +224,36 @@ class InspectorWidget(QWidget):
         except Exception:
             self.current_node.params[key] = val
 
+    def sync_code(self):
+        """Show the current node's code, e.g. after it was edited inline; an
+        inspector edit not applied yet is dropped as older."""
+        if self.current_node is None:
+            return
+        self._code_timer.stop()
+        self._code_node = None
+        if self.txt_code.toPlainText() != self.current_node.code:
+            self.txt_code.blockSignals(True)
+            self.txt_code.setPlainText(self.current_node.code)
+            self.txt_code.blockSignals(False)
+
     def on_code_changed(self):
         if self.current_node:
-            self.current_node.code = self.txt_code.toPlainText()
+            self._code_node = self.current_node
+            self._code_timer.start()
+
+    def apply_code_edit(self):
+        self._code_timer.stop()
+        node, self._code_node = self._code_node, None
+        if node is not None:
+            node.code = self.txt_code.toPlainText()
+            self.code_edited.emit(node)
 
     def clear(self):
+        self.apply_code_edit()
         self.current_node = None
         self.lbl_type.setText("No Selection")
         self.txt_code.clear()
         self.txt_log.clear()
-        while self.form_layout.count():
-            child = self.form_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
+        self.btn_full.setEnabled(False)
+        while self.form_layout.rowCount():
+            self.form_layout.removeRow(0)
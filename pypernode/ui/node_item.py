@@ -1,17 +1,28 @@
 from PyQt5.QtCore import Qt, QRectF
 from PyQt5.QtGui import QColor, QPainter, QPainterPath, QPen
-from PyQt5.QtWidgets import QGraphicsItem, QGraphicsProxyWidget, QTextEdit
+from PyQt5.QtWidgets import QGraphicsItem, QGraphicsProxyWidget, QMenu, QTextEdit
 
 from ..models import NodeData
+from ..timings import format_duration
+from .code_parser import DebouncedCodeParser
 from .sockets import QNodeSocket
 
+NODE_WIDTH = 180
+SOCKET_TOP = 40
+SOCKET_SPACING = 22
+
+
+def socket_offset(index: int, is_output: bool):
+    """Position of a socket relative to its node, usable without a QNodeItem."""
+    return (NODE_WIDTH if is_output else 0), SOCKET_TOP + SOCKET_SPACING * index
+
 
 class QNodeItem(QGraphicsItem):
     def __init__(self, node_data: NodeData, master):
         super().__init__()
         self.node_data = node_data
         self.master = master
-        self.width = 180
+        self.width = NODE_WIDTH
         self.base_height = 80
         self.radius = 8
         self.setFlags(QGraphicsItem.ItemIsMovable | QGraphicsItem.ItemIsSelectable)
@@ -21,29 +32,35 @@ class QNodeItem(QGraphicsItem):
         self.is_code_visible = False
         self.code_proxy = None
         self.result_text = "..."
+        self._code_parser = None
 
         self._init_sockets()
-        self._init_ui()
 
     def _init_sockets(self):
         self.sockets = {'in': [], 'out': []}
-        y = 40
         for i, sock in enumerate(self.node_data.input_defs):
             s = QNodeSocket(self, sock.name, i, False, sock.type)
-            s.setPos(0, y)
+            s.setPos(*socket_offset(i, False))
             self.sockets['in'].append(s)
-            y += 22
 
-        y = 40
         for i, sock in enumerate(self.node_data.output_defs):
             s = QNodeSocket(self, sock.name, i, True, sock.type)
-            s.setPos(self.width, y)
+            s.setPos(*socket_offset(i, True))
             self.sockets['out'].append(s)
-            y += 22
 
-        self.base_height = max(80, y + 10)
+        rows = max(len(self.sockets['in']), len(self.sockets['out']))
+        self.base_height = max(80, SOCKET_TOP + SOCKET_SPACING * rows + 10)
+
+    @property
+    def code_parser(self) -> DebouncedCodeParser:
+        if self._code_parser is None:
+            self._code_parser = DebouncedCodeParser()
+            self._code_parser.definition_ready.connect(self._on_definition_parsed)
+        return self._code_parser
 
     def _init_ui(self):
+        # The inline editor is only built the first time it is shown, which
+        # keeps bulk loading of large graphs cheap.
         te = QTextEdit(self.node_data.code)
         te.setStyleSheet("QTextEdit { background: #1e1e1e; color: #ddd; font-family: Consolas; border: 1px solid #444; }")
         te.setMinimumSize(160, 100)
@@ -55,10 +72,40 @@ class QNodeItem(QGraphicsItem):
 
     def _on_code_changed(self):
         self.node_data.code = self.code_proxy.widget().toPlainText()
-        self.master.inspector_refresh_needed.emit()
+        self.code_parser.schedule(self.node_data.code)
+        self.master.on_inline_code_edited(self.node_data)
+
+    def sync_code_from_model(self):
+        """Pick up code edited elsewhere (e.g. in the inspector)."""
+        editor = self.code_proxy.widget() if self.code_proxy else None
+        if editor is not None and editor.toPlainText() != self.node_data.code:
+            editor.blockSignals(True)
+            editor.setPlainText(self.node_data.code)
+            editor.blockSignals(False)
+        self.code_parser.schedule(self.node_data.code)
+
+    def _on_definition_parsed(self, definition):
+        if not self.node_data.apply_definition(definition):
+            return
+        self.rebuild_sockets()
+        self.master.on_node_signature_changed(self)
+
+    def rebuild_sockets(self):
+        for s in self.sockets['in'] + self.sockets['out']:
+            s.setParentItem(None)
+            if s.scene():
+                s.scene().removeItem(s)
+        self.prepareGeometryChange()
+        self._init_sockets()
+        if self.code_proxy:
+            self.code_proxy.setPos(10, self.base_height + 5)
+        self.update()
 
     def toggle_code(self):
+        self.prepareGeometryChange()
         self.is_code_visible = not self.is_code_visible
+        if self.code_proxy is None:
+            self._init_ui()
         if self.is_code_visible:
             self.code_proxy.show()
         else:
@@ -68,13 +115,9 @@ class QNodeItem(QGraphicsItem):
     def update_result_label(self):
         if self.node_data.last_error:
             self.result_text = "Error"
-        elif self.node_data.last_output:
-            vals = list(self.node_data.last_output.values())
-            if vals:
-                v = vals[0]
-                self.result_text = f"{v:.2f}" if isinstance(v, (int, float)) else str(v)
-            else:
-                self.result_text = "Done"
+        elif self.node_data.has_output:
+            previews = list(self.node_data.previews().values())
+            self.result_text = previews[0].label if previews else "Done"
         else:
             self.result_text = "..."
         self.update()
@@ -114,6 +157,15 @@ class QNodeItem(QGraphicsItem):
         painter.setPen(Qt.green if not self.node_data.last_error else Qt.red)
         painter.drawText(QRectF(0, res_y, self.width, 20), Qt.AlignCenter, self.result_text)
 
+        trend = self.master.regressions.get(self.node_data.id)
+        if trend is not None:
+            # Slower than the node's usual runtime (see history)
+            painter.setBrush(QColor("#8b1a1a"))
+            painter.setPen(Qt.NoPen)
+            painter.drawRoundedRect(QRectF(4, 4, 44, 17), 4, 4)
+            painter.setPen(Qt.white)
+            painter.drawText(QRectF(4, 4, 44, 17), Qt.AlignCenter, trend.badge())
+
         if self.isSelected():
             painter.setPen(QPen(Qt.yellow, 2))
             painter.setBrush(Qt.NoBrush)
@@ -123,6 +175,17 @@ class QNodeItem(QGraphicsItem):
             painter.setPen(QPen(Qt.red, 2))
             painter.drawRoundedRect(rect, self.radius, self.radius)
 
+    def hoverEnterEvent(self, event):
+        trend = self.master.regressions.get(self.node_data.id)
+        if trend is not None:
+            self.setToolTip(
+                f"Last run {format_duration(trend.seconds)}, usually {format_duration(trend.baseline)} "
+                f"(median of {trend.samples} runs)"
+            )
+        else:
+            self.setToolTip("")
+        super().hoverEnterEvent(event)
+
     def mousePressEvent(self, event):
         if event.pos().x() > self.width - 25 and event.pos().y() < 25:
             self.toggle_code()
@@ -130,7 +193,39 @@ class QNodeItem(QGraphicsItem):
         self.master.inspector.set_node(self.node_data)
         super().mousePressEvent(event)
 
+    def contextMenuEvent(self, event):
+        menu = QMenu()
+        evaluate_action = menu.addAction("Evaluate to Here")
+        save_action = menu.addAction("Save as New Node Type")
+        ungroup_action = menu.addAction("Ungroup") if self.node_data.is_group else None
+        map_actions = {}
+        if self.node_data.is_group:
+            mapping = self.node_data.definition.subgraph.get('map') or {}
+            map_menu = menu.addMenu("Map Over")
+            for name in self.node_data.inputs:
+                action = map_menu.addAction(name)
+                action.setCheckable(True)
+                action.setChecked(mapping.get('input') == name)
+                map_actions[action] = (name, bool(mapping.get('processes')))
+            if mapping:
+                map_menu.addSeparator()
+                action = map_menu.addAction("Use Processes")
+                action.setCheckable(True)
+                action.setChecked(bool(mapping.get('processes')))
+                map_actions[action] = (mapping['input'], not mapping.get('processes'))
+                map_actions[map_menu.addAction("No Mapping")] = (None, False)
+        chosen = menu.exec_(event.screenPos())
+        if chosen is evaluate_action:
+            self.master.run_workflow(targets=[self.node_data.id])
+        elif chosen is save_action:
+            self.master.save_node_as_type(self.node_data)
+        elif chosen is not None and chosen is ungroup_action:
+            self.setSelected(True)
+            self.master.ungroup_selected_nodes()
+        elif chosen in map_actions:
+            self.master.set_node_mapping(self.node_data, *map_actions[chosen])
+
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionHasChanged:
-            self.master.update_connections()
+            self.master.on_node_moved(self)
         return super().itemChange(change, value)
@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QFileDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QProgressBar,
+    QPushButton,
+    QSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+)
+
+from ..models import snapshot
+from ..sweep import input_type, parse_values, run_sweep
+from ..values import preview_text
+
+
+class SweepSignals(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+
+class SweepWorker(QRunnable):
+    """Runs a sweep on a pool thread, on snapshots of the graph's nodes (see
+    ExecutionWorker). The part of the graph that does not depend on the sweep
+    runs once; its results are committed to the live nodes on the UI thread."""
+
+    def __init__(self, nodes, connections, grid, outputs, processes, cache=None):
+        super().__init__()
+        self.live = nodes
+        self.nodes = snapshot(nodes)
+        self._versions = {nid: node._output_version for nid, node in self.nodes.items()}
+        self.args = (self.nodes, list(connections), grid, outputs, processes)
+        self.cache = cache
+        self.signals = SweepSignals()
+        # Lambdas, since PyQt holds bound methods weakly
+        self.signals.finished.connect(lambda _: self._commit())
+        self.signals.error.connect(lambda _: self._commit())
+
+    def _commit(self):
+        for nid, node in self.nodes.items():
+            live = self.live.get(nid)
+            if live is not None and node._output_version != self._versions[nid]:
+                live.commit(node)
+
+    def run(self):
+        nodes, connections, grid, outputs, processes = self.args
+        try:
+            # Forking a process that runs Qt threads is unsafe; start clean interpreters
+            result = run_sweep(
+                nodes, connections, grid, outputs, processes,
+                progress=self.signals.progress.emit, mp_context=multiprocessing.get_context("spawn"),
+                cache=self.cache,
+            )
+        except Exception as e:
+            self.signals.error.emit(str(e))
+            return
+        self.signals.finished.emit(result)
+
+
+class SweepDialog(QDialog):
+    """Sweep node inputs over lists of values and show the results as a table."""
+
+    def __init__(self, graph, outputs=None, parent=None, cache=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.setWindowTitle("Parameter Sweep")
+        self.resize(640, 520)
+        self.graph = graph
+        self.outputs = outputs or None
+        self.result = None
+        self._signals = None
+
+        layout = QVBoxLayout(self)
+
+        row = QHBoxLayout()
+        self.cmb_input = QComboBox()
+        connected = {(c['end_node'], c['end_socket']) for c in graph.connections}
+        for nid, node in graph.nodes.items():
+            for idx, name in enumerate(node.inputs):
+                if (nid, idx) not in connected:
+                    self.cmb_input.addItem(f"{node.type} [{nid[:8]}] . {name}", (nid, name))
+        self.txt_values = QLineEdit()
+        self.txt_values.setPlaceholderText("1, 2, 3   or   start:stop:step")
+        btn_add = QPushButton("Add")
+        btn_add.clicked.connect(self.add_param)
+        row.addWidget(self.cmb_input, 2)
+        row.addWidget(self.txt_values, 2)
+        row.addWidget(btn_add)
+        layout.addLayout(row)
+
+        self.tbl_params = QTableWidget(0, 2)
+        self.tbl_params.setHorizontalHeaderLabels(["Input", "Values"])
+        self.tbl_params.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tbl_params.setMaximumHeight(120)
+        layout.addWidget(self.tbl_params)
+        self.grid = {}
+
+        target = "selected nodes" if self.outputs else "nodes without outgoing connections"
+        layout.addWidget(QLabel(f"Results are collected from the {target}."))
+
+        row = QHBoxLayout()
+        row.addWidget(QLabel("Processes:"))
+        self.spin_processes = QSpinBox()
+        self.spin_processes.setRange(0, 256)
+        self.spin_processes.setValue(os.cpu_count() or 1)
+        self.spin_processes.setToolTip("0 runs the sweep without extra processes")
+        row.addWidget(self.spin_processes)
+        row.addStretch()
+        self.btn_run = QPushButton("Run Sweep")
+        self.btn_run.clicked.connect(self.run_sweep)
+        self.btn_save = QPushButton("Save CSV")
+        self.btn_save.setEnabled(False)
+        self.btn_save.clicked.connect(self.save_csv)
+        row.addWidget(self.btn_run)
+        row.addWidget(self.btn_save)
+        layout.addLayout(row)
+
+        self.progress = QProgressBar()
+        layout.addWidget(self.progress)
+
+        self.tbl_results = QTableWidget(0, 0)
+        layout.addWidget(self.tbl_results)
+
+    def add_param(self):
+        axis = self.cmb_input.currentData()
+        if axis is None:
+            return
+        try:
+            values = parse_values(self.txt_values.text(), input_type(self.graph.nodes[axis[0]], axis[1]))
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid values", str(e))
+            return
+        if not values:
+            return
+        if axis not in self.grid:
+            self.tbl_params.insertRow(self.tbl_params.rowCount())
+        self.grid[axis] = values
+        r = list(self.grid).index(axis)
+        self.tbl_params.setItem(r, 0, QTableWidgetItem(self.cmb_input.currentText()))
+        self.tbl_params.setItem(r, 1, QTableWidgetItem(", ".join(preview_text(v) for v in values)))
+        self.txt_values.clear()
+
+    def run_sweep(self):
+        if not self.grid:
+            QMessageBox.information(self, "Parameter Sweep", "Add at least one input to sweep.")
+            return
+        worker = SweepWorker(
+            self.graph.nodes, self.graph.connections, dict(self.grid), self.outputs, self.spin_processes.value(),
+            self.cache,
+        )
+        worker.signals.progress.connect(self.on_progress)
+        worker.signals.finished.connect(self.on_finished)
+        worker.signals.error.connect(self.on_error)
+        self._signals = worker.signals
+        self.btn_run.setEnabled(False)
+        self.progress.setValue(0)
+        QThreadPool.globalInstance().start(worker)
+
+    def on_progress(self, done, total):
+        self.progress.setMaximum(total)
+        self.progress.setValue(done)
+
+    def on_error(self, message):
+        self.btn_run.setEnabled(True)
+        QMessageBox.critical(self, "Sweep failed", message)
+
+    def on_finished(self, result):
+        self.result = result
+        self.btn_run.setEnabled(True)
+        self.btn_save.setEnabled(True)
+        self.tbl_results.clear()
+        self.tbl_results.setColumnCount(len(result.columns))
+        self.tbl_results.setRowCount(len(result.rows))
+        self.tbl_results.setHorizontalHeaderLabels(result.columns)
+        for r, row in enumerate(result.rows):
+            for c, value in enumerate(row):
+                self.tbl_results.setItem(r, c, QTableWidgetItem(preview_text(value)))
+
+    def save_csv(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Sweep Results", "", "CSV (*.csv)")
+        if path and self.result is not None:
+            self.result.write_csv(path)
@@ -1,4 +1,4 @@
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QPainter, QPainterPath, QPen
 from PyQt5.QtWidgets import QGraphicsPathItem, QGraphicsProxyWidget, QGraphicsView
 
@@ -7,6 +7,8 @@ from .sockets import QNodeSocket
 
 
 class NodeView(QGraphicsView):
+    viewport_changed = pyqtSignal()
+
     def __init__(self, scene, master):
         super().__init__(scene)
         self.master = master
@@ -19,6 +21,15 @@ class NodeView(QGraphicsView):
             self.scale(1.1, 1.1)
         else:
             self.scale(0.9, 0.9)
+        self.viewport_changed.emit()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.viewport_changed.emit()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewport_changed.emit()
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasText():
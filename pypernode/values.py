@@ -0,0 +1,182 @@
+"""Hashing, sharing and previewing node values.
+
+Arrays and tables are recognized by duck typing (``__array_interface__``,
+``dtype``/``shape``, pandas' ``DataFrame`` API), so neither NumPy nor pandas
+is required to import this module.
+"""
+
+import hashlib
+import itertools
+import pickle
+import reprlib
+import sys
+from datetime import date
+from typing import Any, Callable, Dict, List
+
+_DIGEST_SIZE = 16
+
+
+def is_array(value: Any) -> bool:
+    return hasattr(value, '__array_interface__') and hasattr(value, 'dtype') and hasattr(value, 'shape')
+
+
+def is_table(value: Any) -> bool:
+    return hasattr(value, 'columns') and hasattr(value, 'dtypes') and hasattr(value, 'iloc')
+
+
+def _update(hasher, value: Any) -> None:
+    if value is None or isinstance(value, (bool, int, float, str, date)):
+        hasher.update(f"{type(value).__name__}:{value!r};".encode('utf-8'))
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        hasher.update(b"bytes:")
+        hasher.update(value)
+    elif is_array(value):
+        hasher.update(f"array:{value.dtype.str}:{value.shape};".encode('utf-8'))
+        if value.dtype.hasobject:
+            hasher.update(pickle.dumps(value.tolist(), protocol=4))
+        else:
+            if not value.flags.c_contiguous:
+                import numpy
+
+                value = numpy.ascontiguousarray(value)
+            # Digest the raw buffer directly, without converting to bytes
+            hasher.update(memoryview(value).cast('B'))
+    elif is_table(value):
+        import pandas
+
+        hasher.update(f"table:{list(value.columns)!r}:{[str(d) for d in value.dtypes]!r};".encode('utf-8'))
+        hasher.update(memoryview(pandas.util.hash_pandas_object(value, index=True).values).cast('B'))
+    elif isinstance(value, dict):
+        hasher.update(b"dict{")
+        for k in sorted(value, key=repr):
+            _update(hasher, k)
+            _update(hasher, value[k])
+        hasher.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f"{type(value).__name__}[{len(value)}".encode('utf-8'))
+        for item in value:
+            _update(hasher, item)
+        hasher.update(b"]")
+    else:
+        try:
+            hasher.update(pickle.dumps(value, protocol=4))
+        except Exception:
+            hasher.update(repr(value).encode('utf-8'))
+
+
+def hash_value(value: Any) -> str:
+    """Content digest of a value; arrays and tables are hashed over their buffers."""
+    hasher = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    _update(hasher, value)
+    return hasher.hexdigest()
+
+
+_size_hooks: Dict[type, Callable[[Any], int]] = {}
+
+# Containers longer than this are sized from an even sample of their items
+_SIZE_SAMPLE = 256
+
+
+def register_size_hook(cls: type, hook: Callable[[Any], int]) -> None:
+    """Tell approx_size how many bytes values of ``cls`` (and subclasses) hold."""
+    _size_hooks[cls] = hook
+
+
+def _sample(items, count: int) -> List[Any]:
+    if count <= _SIZE_SAMPLE:
+        return list(items)
+    if isinstance(items, (list, tuple)):
+        step = count / _SIZE_SAMPLE
+        return [items[int(i * step)] for i in range(_SIZE_SAMPLE)]
+    return list(itertools.islice(items, _SIZE_SAMPLE))
+
+
+def approx_size(value: Any) -> int:
+    """Rough memory footprint of a value in bytes.
+
+    Arrays and tables report their buffers; large containers are
+    extrapolated from a sample of their items, so the cost stays bounded.
+    """
+    for cls in type(value).__mro__:
+        hook = _size_hooks.get(cls)
+        if hook is not None:
+            return int(hook(value))
+    if is_array(value):
+        return int(value.nbytes)
+    if is_table(value):
+        return int(value.memory_usage(index=True, deep=len(value) <= 100_000).sum())
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        items = _sample(value.items(), len(value))
+        per_item = sum(approx_size(k) + approx_size(v) for k, v in items) / max(len(items), 1)
+        return sys.getsizeof(value) + int(per_item * len(value))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = _sample(value, len(value))
+        per_item = sum(approx_size(v) for v in items) / max(len(items), 1)
+        return sys.getsizeof(value) + int(per_item * len(value))
+    return sys.getsizeof(value)
+
+
+def share(value: Any) -> Any:
+    """Prepare an output to be passed to other nodes by reference.
+
+    Arrays are made read-only, so a downstream node cannot modify a buffer
+    that other consumers (and the cache) still see.
+    """
+    if is_array(value) and getattr(value, 'flags', None) is not None:
+        try:
+            value.flags.writeable = False
+        except (ValueError, AttributeError):
+            pass
+    return value
+
+
+_label_repr = reprlib.Repr()
+_label_repr.maxstring = _label_repr.maxother = 40
+_label_repr.maxlist = _label_repr.maxtuple = _label_repr.maxset = _label_repr.maxdict = 4
+_label_repr.maxlevel = 2
+
+
+def preview_text(value: Any) -> str:
+    """Short one-line description suitable for a node label.
+
+    Only a bounded part of the value is formatted, so this stays cheap for
+    large strings and containers.
+    """
+    if isinstance(value, bool) or value is None:
+        return str(value)
+    if isinstance(value, (int, float)):
+        return f"{value:.2f}"
+    if is_array(value):
+        shape = "×".join(str(n) for n in value.shape) or "scalar"
+        return f"array {value.dtype} [{shape}]"
+    if is_table(value):
+        rows, cols = value.shape
+        return f"table {rows}×{cols}"
+    if isinstance(value, str):
+        text = value[:41]
+    elif isinstance(value, (list, tuple, dict, set, frozenset)):
+        text = f"{type(value).__name__}[{len(value)}] {_label_repr.repr(value)}"
+    else:
+        text = str(value)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+
+def to_jsonable(value: Any) -> Any:
+    """Plain JSON data for a value: arrays become nested lists, tables a
+    column -> values mapping, dates ISO strings."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, date):
+        return value.isoformat()
+    if is_array(value):
+        return value.tolist()
+    if is_table(value):
+        return {str(c): to_jsonable(value[c].tolist()) for c in value.columns}
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    return str(value)
+
@@ -0,0 +1,131 @@
+"""Watch mode: running a graph again when the files it reads change.
+
+The files watched are those named by string inputs of nodes with the
+``watch`` cache policy (see policies), the same ones that are part of those
+nodes' cache keys. Files are polled for their modification time and size.
+When some change, only the nodes downstream of the nodes reading them are
+evaluated again; everything else is served from the result cache. Changes
+that come in a burst (an editor saving twice, a copy in progress) are
+gathered until the files have been quiet for ``debounce`` seconds, and then
+handled by a single run.
+
+FileWatcher does the polling and is shared by the ``watch`` command
+(GraphWatcher) and the editor, which polls from a timer instead of a loop.
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from .engine import GraphExecutor, ancestors, descendants, file_stamp
+
+
+class FileWatcher:
+    """Modification stamps of a set of files, and the nodes reading each."""
+
+    def __init__(self, interval: float = 0.5, debounce: float = 0.3):
+        self.interval = interval
+        self.debounce = debounce
+        self.readers: Dict[str, List[str]] = {}
+        self._stamps: Dict[str, Optional[str]] = {}
+
+    def watch(self, files: Dict[str, List[str]]) -> None:
+        """Watch ``files`` (path -> reading node ids) from now on. A file that
+        was deleted stays watched, so it is noticed when it comes back."""
+        readers = dict(files)
+        for path, nids in self.readers.items():
+            if path not in readers and self._stamps.get(path) is None:
+                readers[path] = nids
+        self.readers = readers
+        self._stamps = {path: self._stamps[path] if path in self._stamps else file_stamp(path) for path in readers}
+
+    def changes(self) -> Set[str]:
+        """Files whose stamp changed since the last call (or since ``watch``)."""
+        changed = set()
+        for path, old in self._stamps.items():
+            new = file_stamp(path)
+            if new != old:
+                self._stamps[path] = new
+                changed.add(path)
+        return changed
+
+    def wait(self, stop: Optional[threading.Event] = None) -> Set[str]:
+        """Block until files changed and then stayed quiet for ``debounce``
+        seconds; returns every file that changed meanwhile. Returns an empty
+        set once ``stop`` is set."""
+        stop = stop or threading.Event()
+        changed: Set[str] = set()
+        while not stop.is_set():
+            if changed:
+                if stop.wait(self.debounce):
+                    break
+                more = self.changes()
+                if not more:
+                    return changed
+                changed |= more
+            else:
+                if stop.wait(self.interval):
+                    break
+                changed = self.changes()
+        return set()
+
+    def affected(self, changed: Iterable[str]) -> Set[str]:
+        """Ids of the nodes reading any of the ``changed`` files."""
+        return {nid for path in changed for nid in self.readers.get(path, ())}
+
+
+def rerun_targets(executor: GraphExecutor, readers: Iterable[str], targets: Optional[Iterable[str]] = None) -> List[str]:
+    """Nodes to evaluate after ``readers`` saw their files change: everything
+    downstream of them, limited to what ``targets`` need if given."""
+    plan = executor.plan
+    stale = descendants(plan, [nid for nid in readers if nid in plan.adj])
+    if targets is not None:
+        stale &= ancestors(plan, targets)
+    return [nid for nid in plan.order if nid in stale]
+
+
+class GraphWatcher:
+    """Runs a graph, then runs the affected part again on every file change."""
+
+    def __init__(
+        self,
+        executor: GraphExecutor,
+        targets: Optional[Iterable[str]] = None,
+        interval: float = 0.5,
+        debounce: float = 0.3,
+    ):
+        self.executor = executor
+        self.targets = list(targets) if targets is not None else None
+        self.files = FileWatcher(interval, debounce)
+        # Latest outputs of every node evaluated so far, to resolve file inputs
+        self.results: Dict[str, Dict[str, object]] = {}
+
+    def run(self, targets: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, object]]:
+        results = self.executor.run(targets=targets)
+        self.results.update(results)
+        self.files.watch(self.executor.watched_files(self.results))
+        return results
+
+    def loop(
+        self,
+        on_run: Callable[[Set[str], List[str], Dict[str, Dict[str, object]]], None],
+        on_error: Optional[Callable[[Exception], None]] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """Wait for changes and re-run until ``stop`` is set, reporting each
+        run as ``on_run(changed files, evaluated ids, results)``."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            changed = self.files.wait(stop)
+            if not changed:
+                continue
+            order = rerun_targets(self.executor, self.files.affected(changed), self.targets)
+            if not order:
+                continue
+            try:
+                results = self.run(order)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(e)
+                continue
+            on_run(changed, order, results)
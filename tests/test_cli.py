@@ -0,0 +1,10 @@
+import pytest
+
+from pypernode.__main__ import main
+
+
+def test_worker_and_sandbox_are_exclusive(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(["run", str(tmp_path / "graph.ppng"), "--worker", "localhost:8765", "--sandbox", "2"])
+    assert exc.value.code == 2
+    assert "not allowed with argument" in capsys.readouterr().err
@@ -0,0 +1,17 @@
+from pypernode import groups
+from pypernode.graph import Graph
+from pypernode.library import rename_node_code
+
+
+def test_rename_group_code():
+    graph = Graph()
+    a = graph.create_node("constant", 0, 0)
+    b = graph.create_node("add", 0, 0)
+    graph.add_connection(a.id, 0, b.id, 0)
+    code = graph.nodes[groups.collapse(graph, [a.id, b.id], "pair")].code
+
+    renamed = rename_node_code(code, "pair", "couple")
+    doc = groups.load_group_doc(code)
+    doc["name"] = "couple"
+    assert renamed == groups.dump_group_doc(doc)
+    assert groups.parse_group(renamed).name == "couple"
@@ -0,0 +1,33 @@
+import pytest
+
+from pypernode.interpreter import parse_function
+from pypernode.policies import CachePolicy
+
+
+def _policy(code):
+    return parse_function(code).cache_policy
+
+
+def test_cache_comment_sets_policy():
+    code = "# cache: ttl=5m, max_size=10MB\ndef fetch(url: str) -> str:\n    return url\n"
+    assert _policy(code) == CachePolicy("ttl", 300.0, 10 << 20)
+
+
+def test_cache_prose_comment_is_ignored():
+    code = "# cache: results keyed by url\ndef fetch(url: str) -> str:\n    return url\n"
+    assert _policy(code) == CachePolicy()
+
+
+def test_policy_comment_after_prose_comment():
+    code = (
+        "def fetch(url: str) -> str:\n"
+        "    # cache: results keyed by url\n"
+        "    # cache: never\n"
+        "    return url\n"
+    )
+    assert _policy(code).mode == "never"
+
+
+def test_invalid_policy_value_still_fails():
+    with pytest.raises(ValueError):
+        _policy("# cache: ttl=soon\ndef fetch(url: str) -> str:\n    return url\n")
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from pypernode.graph import Graph
+from pypernode.server import GraphService
+
+SLOW = "import time\ndef slow(x: float) -> float:\n    time.sleep(0.5)\n    return x * 2\n"
+
+
+def test_overlapping_runs_of_one_graph(tmp_path, monkeypatch):
+    monkeypatch.setenv("PYPERNODE_HOME", str(tmp_path / "home"))
+    graph = Graph()
+    src = graph.create_node("constant", 0, 0)
+    slow = graph.create_node("constant", 0, 0, code=SLOW)
+    graph.add_connection(src.id, 0, slow.id, 0)
+    path = str(tmp_path / "slow.ppng")
+    graph.save(path)
+
+    service = GraphService()
+    service.load("slow", path)
+    results, errors = {}, []
+
+    def run(value):
+        try:
+            results[value] = service.run("slow", {src.id: {"value": value}}, [slow.id])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(value,)) for value in (1.0, 2.0)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    assert not errors
+    assert results[1.0] == {slow.id: {"result": 2.0}}
+    assert results[2.0] == {slow.id: {"result": 4.0}}
+    # Both ran at the same time rather than one after the other
+    assert elapsed < 0.9
+    # The loaded graph itself is not written to by requests
+    assert not service.graphs["slow"].graph.nodes[slow.id].has_output
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+pytest.importorskip("PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from pypernode.graph import Graph  # noqa: E402
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    monkeypatch.setenv("PYPERNODE_HOME", str(tmp_path / "home"))
+    from pypernode.window import MainWindow
+
+    app = QApplication.instance() or QApplication([])
+    win = MainWindow()
+    yield win
+    win.close()
+    app.processEvents()
+
+
+def test_truncated_file_leaves_graph_intact(window, tmp_path):
+    saved = Graph()
+    a = saved.create_node("constant", 0, 0)
+    b = saved.create_node("add", 200, 0)
+    saved.add_connection(a.id, 0, b.id, 0)
+    path = str(tmp_path / "graph.ppng")
+    saved.save(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-10])
+
+    current = window.graph.create_node("constant", 0, 0)
+    window.materialize_node(current.id)
+    with pytest.raises(ValueError):
+        window.open_graph(path)
+    assert list(window.graph.nodes) == [current.id]
+    assert window.find_item(current.id) is not None